@@ -21,6 +21,68 @@
 #
 
 import time  # Used for testing purposes / map visualization when time.sleep is uncommented
+import heapq
+import numpy as np
+
+# neighbor order used for the packed neighborhood code (matches direction_To_Index)
+NEIGHBOR_NAMES = ["N", "E", "S", "W", "NE", "NW", "SE", "SW"]
+NEIGHBOR_OFFSETS = [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (-1, -1), (1, 1), (-1, 1)]
+
+# 2-bit state of each neighbor: traversed, wall, open or unknown
+TILE_TRAVERSED = 0
+TILE_WALL = 1
+TILE_OPEN = 2
+TILE_UNKNOWN = 3
+TILE_STATES = {"w": TILE_WALL, "g": TILE_OPEN}
+
+# neighborhood with every neighbor open and untraversed
+ALL_OPEN_CODE = sum(TILE_OPEN << (2 * index) for index in range(8))
+
+# pruning patterns: every direction in the first list must be traversed or a
+# wall, and every direction in the second list must be open and untraversed;
+# neither may be the tile the agent is standing on
+PRUNE_RULES = [
+    [["N", "E", "W", "SE", "SW"], []],
+    [["N", "E", "S", "SW", "NW"], []],
+    [["E", "S", "W", "NE", "NW"], []],
+    [["N", "S", "W", "NE", "SE"], []],
+    [["N", "E", "W"], ["SW", "S", "SE"]],
+    [["N", "E", "S"], ["W", "SW", "NW"]],
+    [["E", "S", "W"], ["N", "NE", "NW"]],
+    [["N", "S", "W"], ["E", "NE", "SE"]],
+    [["N", "E"], ["S", "W", "SW"]],
+    [["E", "S"], ["N", "W", "NW"]],
+    [["S", "W"], ["N", "E", "NE"]],
+    [["N", "W"], ["E", "S", "SE"]],
+    [["N"], ["E", "SE", "S", "SW", "W"]],
+    [["E"], ["N", "NW", "W", "SW", "S"]],
+    [["S"], ["E", "NE", "N", "NW", "W"]],
+    [["W"], ["N", "NE", "E", "SE", "S"]],
+]
+
+
+# function to build the pruning lookup table: for every neighborhood code, a
+# 9-bit mask whose bit k is set when the tile is pruned with the agent on
+# neighbor k (bit 8 means the agent is not next to the tile)
+def build_prune_table():
+    codes = np.arange(1 << 16)
+    states = [(codes >> (2 * index)) & 3 for index in range(8)]
+    table = np.zeros(1 << 16, dtype=np.int64)
+    for blocked, open_tiles in PRUNE_RULES:
+        match = np.ones(1 << 16, dtype=bool)
+        for name in blocked:
+            match &= states[NEIGHBOR_NAMES.index(name)] <= TILE_WALL
+        for name in open_tiles:
+            match &= states[NEIGHBOR_NAMES.index(name)] == TILE_OPEN
+        agent_bits = 0
+        for agent in range(9):
+            if agent == 8 or NEIGHBOR_NAMES[agent] not in blocked + open_tiles:
+                agent_bits |= 1 << agent
+        table[match] |= agent_bits
+    return table.tolist()
+
+
+PRUNE_TABLE = build_prune_table()
 
 
 class AI:
@@ -67,12 +129,32 @@ class AI:
 
         self.unmarked = {}
 
+        # variable to record the order tiles entered unmarked in, which is the
+        # order prune_tiles evaluates them in
+        self.unmarked_order = {}
+        self.unmarked_count = 0
+
+        # variable to record unmarked tiles whose neighborhood changed since
+        # they were last evaluated by prune_tiles
+        self.dirty = set()
+
+        # variables to record the in-progress pruning pass
+        self.prune_heap = None
+        self.prune_pending = set()
+        self.prune_seq = -1
+
         # variable to record tiles that have been traveled to or pruneed out
-        self.traversed = []
+        self.traversed_set = set()
 
         # variable to record tiles that have been traveled to
         self.traversed_loop = []
 
+        # variable for constant-time membership checks against traversed_loop
+        self.traversed_loop_set = set()
+
+        # variable to record every index of each position in traversed_loop
+        self.traversed_loop_index = {}
+
         # variable to record current tile position
         self.position = [1, 1]
 
@@ -106,102 +188,104 @@ class AI:
             base_position = self.position
             for i in range(len(percepts[move])):
                 base_position = self.calculate_position(base_position, move)
+                if self.map.get(base_position) != percepts[move][i]:
+                    self.mark_neighbors_dirty(base_position)
                 self.map[base_position] = percepts[move][i]
-                if base_position not in self.traversed or percepts[move][i] != "w":
+                if base_position not in self.traversed_set or percepts[move][i] != "w":
+                    if base_position not in self.unmarked:
+                        self.unmarked_order[base_position] = self.unmarked_count
+                        self.unmarked_count += 1
+                        self.dirty.add(base_position)
                     self.unmarked[base_position] = percepts[move][i]
 
+    # function to flag an unmarked tile for re-evaluation by prune_tiles
+    def mark_dirty(self, coord):
+        if coord not in self.unmarked:
+            return
+        # tiles still ahead of the current pruning pass are evaluated in it
+        if self.prune_heap is not None and self.unmarked_order[coord] > self.prune_seq:
+            if coord not in self.prune_pending:
+                self.prune_pending.add(coord)
+                heapq.heappush(self.prune_heap, (self.unmarked_order[coord], coord))
+            return
+        self.dirty.add(coord)
+
+    # function to flag the 8 tiles around a changed tile for re-evaluation
+    def mark_neighbors_dirty(self, coord):
+        for move in self.direction_To_Coord:
+            self.mark_dirty(self.calculate_position(coord, move))
+
+    # function to record a traversed tile
+    def mark_traversed(self, coord):
+        if coord not in self.traversed_set:
+            self.traversed_set.add(coord)
+            self.mark_neighbors_dirty(coord)
+
+    # function to record a traveled tile in both the ordered list and the set
+    def mark_traversed_loop(self, coord):
+        self.traversed_loop_index.setdefault(coord, []).append(len(self.traversed_loop))
+        self.traversed_loop.append(coord)
+        self.traversed_loop_set.add(coord)
+
     def update_traversal_maps(self, coord):
-        self.traversed.append(coord)
+        self.mark_traversed(coord)
         self.unmarked.pop(coord)
+        self.dirty.discard(coord)
         if coord in self.visit_queue:
             self.visit_queue.remove(coord)
 
+    # function to prune unmarked tiles whose surroundings rule them out
     def prune_tiles(self):
-
-        copy_dict = self.unmarked.copy()
-        for coord in copy_dict:
-            position_list = []
-            for i in self.direction_To_Coord.keys():
-
-                if self.calculate_position(coord, i) in self.traversed:
-                    position_list += ["t"]
-                elif self.map.get(self.calculate_position(coord, i), False) in (
-                    "w",
-                    "g",
-                ):
-                    position_list += [
-                        self.map.get(self.calculate_position(coord, i), False)
-                    ]
-                else:
-                    position_list += ["u"]
-
-            if len(position_list) == 8:
-                check_list = [
-                    [["N", "E", "W", "SE", "SW"], []],
-                    [["N", "E", "S", "SW", "NW"], []],
-                    [["E", "S", "W", "NE", "NW"], []],
-                    [["N", "S", "W", "NE", "SE"], []],
-                    [["N", "E", "W"], ["SW", "S", "SE"]],
-                    [["N", "E", "S"], ["W", "SW", "NW"]],
-                    [["E", "S", "W"], ["N", "NE", "NW"]],
-                    [["N", "S", "W"], ["E", "NE", "SE"]],
-                    [["N", "E"], ["S", "W", "SW"]],
-                    [["E", "S"], ["N", "W", "NW"]],
-                    [["S", "W"], ["N", "E", "NE"]],
-                    [["N", "W"], ["E", "S", "SE"]],
-                    [["N"], ["E", "SE", "S", "SW", "W"]],
-                    [["E"], ["N", "NW", "W", "SW", "S"]],
-                    [["S"], ["E", "NE", "N", "NW", "W"]],
-                    [["W"], ["N", "NE", "E", "SE", "S"]],
-                ]
-                if all(x in ("g") for x in position_list):
-                    self.update_traversal_maps(coord)
+        # only tiles whose neighborhood changed can change their result;
+        # they are evaluated in the order they entered unmarked
+        self.prune_heap = [(self.unmarked_order[coord], coord) for coord in self.dirty]
+        heapq.heapify(self.prune_heap)
+        self.prune_pending = set(self.dirty)
+        self.dirty = set()
+        while self.prune_heap:
+            seq, coord = heapq.heappop(self.prune_heap)
+            self.prune_pending.discard(coord)
+            if self.unmarked_order.get(coord) != seq or coord not in self.unmarked:
+                continue
+            self.prune_seq = seq
+            result = self.prune_check(coord)
+            if result:
+                self.update_traversal_maps(coord)
+                if result == 2:
                     break
-                else:
-                    for i in check_list:
-                        if all(
-                            (
-                                position_list[self.direction_To_Index.get(x, False)]
-                                in ("t", "w")
-                            )
-                            and (
-                                self.calculate_position(coord, x)
-                                != tuple(self.position)
-                            )
-                            for x in i[0]
-                        ):
-                            if (
-                                all(
-                                    (
-                                        position_list[
-                                            self.direction_To_Index.get(x, False)
-                                        ]
-                                        == "g"
-                                    )
-                                    and (
-                                        self.calculate_position(coord, x)
-                                        not in self.traversed
-                                    )
-                                    and (
-                                        self.calculate_position(coord, x)
-                                        != tuple(self.position)
-                                    )
-                                    for x in i[1]
-                                )
-                            ) or (
-                                self.calculate_position(coord, i[0][0])
-                                == tuple(self.position)
-                                and len(i[0]) in range(3, 8)
-                            ):
-
-                                self.update_traversal_maps(coord)
-                                break
+        # tiles the pass did not reach stay dirty for the next one
+        self.dirty.update(self.prune_pending)
+        self.prune_heap = None
+        self.prune_pending = set()
+        self.prune_seq = -1
+
+    # function to classify a tile: 0 keep, 1 prune, 2 prune and end the pass
+    def prune_check(self, coord):
+        # pack the 8-neighborhood into 2 bits per direction and note which
+        # neighbor (if any) the agent is standing on
+        position = tuple(self.position)
+        code = 0
+        agent = 8
+        for index, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            neighbor = (coord[0] + dx, coord[1] + dy)
+            if neighbor in self.traversed_set:
+                state = TILE_TRAVERSED
+            else:
+                state = TILE_STATES.get(self.map.get(neighbor), TILE_UNKNOWN)
+            code |= state << (2 * index)
+            if neighbor == position:
+                agent = index
+        if code == ALL_OPEN_CODE:
+            return 2
+        return (PRUNE_TABLE[code] >> agent) & 1
 
     # function to change agent position according to chosen movement
     def update_position(self, move):
         # assign movement increments and modify position
         dx, dy = self.direction_To_Coord[move]
+        self.mark_neighbors_dirty(tuple(self.position))
         self.position = [self.position[0] + dx, self.position[1] + dy]
+        self.mark_neighbors_dirty(tuple(self.position))
 
     # function to check if desired agent position is valid
     def valid_move(self, direction, percepts):
@@ -209,7 +293,7 @@ class AI:
         dx, dy = self.direction_To_Coord[direction]
         new_position = (self.position[0] + dx, self.position[1] + dy)
         # check if chosen position is valid and has not been traversed
-        if percepts[direction][0] == "w" or new_position in self.traversed:
+        if percepts[direction][0] == "w" or new_position in self.traversed_set:
             return False
         return new_position
 
@@ -232,71 +316,22 @@ class AI:
                 temp_branch += 1
         return temp_branch
 
-    # function to recalculate possible branches for each position
+    # function to recalculate possible branches after a position is recorded
     def branch_recheck(self, percepts):
-        for iter, branch in enumerate(self.branch_num_max):
-            temp_branch = branch
-            for move in self.valid_moves:
-                new_position = self.calculate_position(self.traversed_loop[iter], move)
-                if new_position in self.traversed_loop:
-                    temp_branch = temp_branch - 1
-            self.branch_num[iter] = temp_branch
-
-    # function to check if agent has gone around a loop TODO
-    def loop_check(self, percepts):
-        # check possible modified positions
-        for move in self.valid_moves:
-            if self.valid_move_loop(move, percepts):
-                temp_move = move
-                break
-            if move == "W":
-                return [False, False]
-        # assign movement increments and modify position
-        new_pos = self.calculate_position(
-            self.position, self.direction_To_Coord[temp_move]
-        )
-
-        # check where the (possible) loop starts
-        for iter, pos in enumerate(self.traversed):
-            if pos == new_pos:
-                temp_iter = len(self.traversed) - iter
-                break
-        self.move_stack.append(self.oppMove[temp_move])
-        if temp_iter > len(self.move_stack):
-            return [False, False]
-        # check if the movements form a loop
-        # no opposing movement indicates a loop
-        temp_len = 0
-        first_pos = None
-        last_pos = None
-        for iter, move in enumerate(self.move_stack):
-            if iter == (len(self.move_stack) - temp_iter):
-                last_move = move
-                first_pos = self.traversed[iter]
-                temp_len = temp_len + 1
-            elif iter > (len(self.move_stack) - temp_iter):
-                if self.oppMove[last_move] == move:
-                    self.move_stack.pop()
-                    return [False, False]
-                last_move = move
-                last_pos = self.traversed[iter]
-                temp_len = temp_len + 1
-        if last_pos != None:
-            last_pos = self.calculate_position(
-                last_pos, self.direction_To_Coord[temp_move]
-            )
-        if first_pos != last_pos:
-            self.move_stack.pop()
-            return [False, False]
-        if temp_len > 1:
-            self.move_stack.pop()
-            return [temp_move, temp_iter - 1]
-        else:
-            self.move_stack.pop()
-            return [
-                False,
-                False,
-            ]  # 26 13 for worldB loop test - 29 6 for worldB dead end test
+        # only the newest entry and the entries next to it can change
+        iter = len(self.branch_num_max) - 1
+        position = self.traversed_loop[iter]
+        neighbors = [self.calculate_position(position, move) for move in self.valid_moves]
+        temp_branch = self.branch_num_max[iter]
+        for new_position in neighbors:
+            if new_position in self.traversed_loop_set:
+                temp_branch = temp_branch - 1
+        self.branch_num[iter] = temp_branch
+        # a first visit closes one branch of every entry for its neighbors
+        if len(self.traversed_loop_index[position]) == 1:
+            for new_position in neighbors:
+                for other in self.traversed_loop_index.get(new_position, []):
+                    self.branch_num[other] = self.branch_num[other] - 1
 
     # function to check if agent has gone around a loop TODO
     def loop_check_new(self, percepts):
@@ -315,20 +350,22 @@ class AI:
                 # assign movement increments and modify position
                 dx, dy = self.direction_To_Coord[temp_move]
                 new_pos = (self.position[0] + dx, self.position[1] + dy)
-                # check where the (possible) loop starts
-                for iter, pos in enumerate(self.traversed_loop):
-                    if pos == new_pos:
-                        temp_iter = len(self.traversed_loop) - iter
-                        break
-                    else:
-                        temp_iter = len(self.move_stack_run) + 1
+                # check where the (possible) loop starts: the first time the
+                # new position was recorded
+                if new_pos in self.traversed_loop_index:
+                    temp_iter = len(self.traversed_loop) - self.traversed_loop_index[new_pos][0]
+                else:
+                    temp_iter = len(self.move_stack_run) + 1
                 if temp_iter <= len(self.move_stack_run):
                     self.move_stack_run.append(self.oppMove[temp_move])
                     # check if the movements form a loop
                     # no opposing movement indicates a loop
                     temp_len = 0
                     first_pos, last_pos, last_move = (None,) * 3
-                    for iter, move_sub in enumerate(self.move_stack_run):
+                    # only the moves from the loop start onwards matter
+                    loop_start = len(self.move_stack_run) - temp_iter
+                    for iter in range(loop_start, len(self.move_stack_run)):
+                        move_sub = self.move_stack_run[iter]
                         if iter == (len(self.move_stack_run) - temp_iter):
 
                             for move in self.valid_moves:
@@ -394,8 +431,8 @@ class AI:
         return False
 
     def goal_approach_iteration(self, percepts, move):
-        self.traversed.append(tuple(self.position))
-        self.traversed_loop.append(tuple(self.position))
+        self.mark_traversed(tuple(self.position))
+        self.mark_traversed_loop(tuple(self.position))
         self.branch_num_max.append(self.branch_check(percepts))
         self.branch_num.append(self.branch_check(percepts))
         self.branch_recheck(percepts)
@@ -440,21 +477,22 @@ class AI:
             # check to see if all movements have been attempted
             # if backtrack record exists, attempt movement back
             if self.move_stack and move_index == 3:
-                self.traversed.append(tuple(self.position))
-                self.traversed_loop.append(tuple(self.position))
+                self.mark_traversed(tuple(self.position))
+                self.mark_traversed_loop(tuple(self.position))
                 self.branch_num_max.append(self.branch_check(percepts))
                 self.branch_num.append(self.branch_check(percepts))
                 self.branch_recheck(percepts)
 
                 # check if agent has performed a loop
+                # (the check leaves no trace, so its result is reused below)
+                loop_result = self.loop_check_new(percepts)
                 if (
-                    self.loop_check_new(percepts)[0] != False
+                    loop_result[0] != False
                     and self.loop_flag == False
                     and self.backtrack_flag == False
                 ):
                     # removes loop removal function v
-                    temp_loop = []
-                    temp_loop = self.loop_check_new(percepts)
+                    temp_loop = loop_result
                     self.multi_pop(temp_loop[1])
                     self.update_position(temp_loop[0])
                     self.move_stack_run.append(self.oppMove[temp_loop[0]])
@@ -0,0 +1,60 @@
+import sys
+import numpy as np
+import display_backends
+
+class AnsiDisplay(display_backends.DisplayBackend):
+    """
+    Draws the world in a terminal with ANSI escape codes, two characters per
+    cell. The full map is written once; each update only rewrites the cells
+    whose code changed plus the agent's old and new cells.
+    """
+
+    AGENT_GLYPHS = {'N': '^', 'E': '>', 'S': 'v', 'W': '<'}
+
+    def __init__(self, the_world, agent_x, agent_y, out=None):
+        super().__init__(the_world, agent_x, agent_y)
+        self.out = out if out is not None else sys.stdout
+        self.backgrounds = {
+            cell: "\x1b[48;2;{};{};{}m".format(
+                *(int(color[k:k+2], 16) for k in (1, 3, 5))
+            )
+            for cell, color in display_backends.CELL_COLORS.items()
+        }
+        self.cells = the_world.world_map.copy()
+        self.first_frame = True
+
+    def cell_text(self, x, y, glyph=None):
+        cell = self.world.get_cell(x, y)
+        if glyph is None:
+            glyph = cell if cell.isdigit() else " "
+        # cursor positions are 1-based
+        return (
+            f"\x1b[{y + 1};{2 * x + 1}H"
+            f"{self.backgrounds[cell]}\x1b[38;2;0;0;0m{glyph} \x1b[0m"
+        )
+
+    def update(self, agent_x, agent_y, facing):
+        parts = []
+        if self.first_frame:
+            parts.append("\x1b[?25l\x1b[2J")
+            for y in range(self.world.get_height()):
+                for x in range(self.world.get_width()):
+                    parts.append(self.cell_text(x, y))
+            self.first_frame = False
+        else:
+            ys, xs = np.nonzero(self.world.world_map != self.cells)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                parts.append(self.cell_text(x, y))
+            parts.append(self.cell_text(self.agent_x, self.agent_y))
+        self.cells[:] = self.world.world_map
+
+        self.agent_x = agent_x
+        self.agent_y = agent_y
+        parts.append(self.cell_text(agent_x, agent_y, AnsiDisplay.AGENT_GLYPHS[facing]))
+        self.out.write("".join(parts))
+        self.out.flush()
+
+    def quit(self):
+        # leave the cursor below the map
+        self.out.write(f"\x1b[{self.world.get_height() + 1};1H\x1b[?25h\n")
+        self.out.flush()
@@ -0,0 +1,108 @@
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import world
+import misc
+import sim
+
+SUMMARY_FIELDS = [
+    "world", "run", "ai_mode", "turns", "score", "ai_state",
+    "ai_p99_ms", "ai_max_ms", "wall_time", "error"
+]
+
+# The last world this worker process loaded, with a snapshot of its start
+# state, so repeated runs of one world reuse it instead of loading again.
+loaded = {}
+
+def load_world(world_filename, use_cache):
+    if loaded.get("filename") != world_filename:
+        loaded.clear()
+        # Checked here because World.load_world reports a missing file on
+        # stdout, where it would land in the middle of the summary CSV.
+        if not os.path.isfile(world_filename):
+            raise misc.InvalidWorldException(f"{world_filename} was not found.")
+        the_world = world.World(world_filename, use_cache)
+        the_world.load_world()
+        if the_world.get_width() == 0:
+            raise misc.InvalidWorldException(f"{world_filename} could not be loaded.")
+        loaded.update({
+            "filename": world_filename,
+            "world": the_world,
+            "snapshot": the_world.snapshot()
+        })
+    the_world = loaded["world"]
+    the_world.restore(loaded["snapshot"])
+    return the_world
+
+def run_one(job):
+    world_filename, run, max_turns, ai_mode, use_cache = job
+    start = time.perf_counter()
+    row = {"world": world_filename, "run": run, "ai_mode": ai_mode}
+    try:
+        the_world = load_world(world_filename, use_cache)
+        # Looping runs are stopped early: they would only burn CPU until
+        # max_turns without changing the outcome.
+        result = sim.run_sim(
+            the_world,
+            max_turns,
+            quiet=True,
+            ai_mode=ai_mode,
+            detect_cycles=True
+        )
+        row.update({
+            "turns": result["turns"],
+            "score": result["score"],
+            "ai_state": result["ai_state"],
+            "ai_p99_ms": round(result["latency"]["p99"] * 1000, 3),
+            "ai_max_ms": round(result["latency"]["max"] * 1000, 3)
+        })
+    except (misc.InvalidCellException, misc.InvalidWorldException) as e:
+        row.update({
+            "turns": 0, "score": None, "ai_state": "INVALID_WORLD", "error": str(e)
+        })
+    except Exception as e:
+        # Any other failure (an AI bug, an unreadable file) is recorded as
+        # this run's row so that the rest of the batch still runs.
+        row.update({
+            "turns": 0,
+            "score": None,
+            "ai_state": "ERROR",
+            "error": f"{type(e).__name__}: {e}"
+        })
+    row["wall_time"] = round(time.perf_counter() - start, 6)
+    return row
+
+def run_batch(
+    world_filenames,
+    runs=1,
+    max_turns=None,
+    summary=None,
+    workers=None,
+    ai_mode="dfs",
+    use_cache=True
+):
+    jobs = [
+        (world_filename, run, max_turns, ai_mode, use_cache)
+        for world_filename in world_filenames
+        for run in range(runs)
+    ]
+
+    writer = csv.DictWriter(
+        summary if summary is not None else sys.stdout,
+        fieldnames=SUMMARY_FIELDS
+    )
+    writer.writeheader()
+
+    # Rows come back in job order, one per finished run. The runs of one
+    # world are split evenly across the workers, so each worker mostly
+    # reuses the world it already loaded while all of them stay busy.
+    workers = workers or os.cpu_count() or 1
+    chunksize = math.ceil(runs / workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for row in pool.map(run_one, jobs, chunksize=chunksize):
+            writer.writerow(row)
+            if summary is not None:
+                summary.flush()
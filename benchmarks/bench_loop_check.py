@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ai
+import sim
+import world
+import worldgen
+
+# Micro-benchmark for AI.loop_check_new on looped mazes. Each world is run
+# headless while every loop_check_new call is timed. Afterwards the loop-start
+# search over the final traversed_loop is timed twice: with the linear scan
+# loop_check_new used to do, and with the traversed_loop_index lookup.
+
+MAX_TURNS = 20000
+
+def linear_loop_start(traversed_loop, position):
+    for iter, pos in enumerate(traversed_loop):
+        if pos == position:
+            return iter
+    return None
+
+def indexed_loop_start(traversed_loop_index, position):
+    indices = traversed_loop_index.get(position)
+    return indices[0] if indices else None
+
+def bench_world(world_filename, max_turns=MAX_TURNS):
+    stats = {"calls": 0, "time": 0.0, "ai": None}
+    loop_check_new = ai.AI.loop_check_new
+
+    def timed_loop_check_new(self, percepts):
+        start = time.perf_counter()
+        result = loop_check_new(self, percepts)
+        stats["time"] += time.perf_counter() - start
+        stats["calls"] += 1
+        stats["ai"] = self
+        return result
+
+    ai.AI.loop_check_new = timed_loop_check_new
+    try:
+        the_world = world.World(world_filename)
+        the_world.load_world()
+        start = time.perf_counter()
+        result = sim.run_sim(the_world, max_turns, quiet=True)
+        run_time = time.perf_counter() - start
+    finally:
+        ai.AI.loop_check_new = loop_check_new
+
+    row = {
+        "world": os.path.basename(world_filename),
+        "turns": result["turns"],
+        "calls": stats["calls"],
+        "run_s": run_time,
+        "loop_check_us": 1e6 * stats["time"] / max(stats["calls"], 1),
+        "linear_us": 0.0,
+        "indexed_us": 0.0
+    }
+
+    the_ai = stats["ai"]
+    if the_ai is not None and the_ai.traversed_loop:
+        positions = list(the_ai.traversed_loop_set)
+        start = time.perf_counter()
+        for position in positions:
+            linear_loop_start(the_ai.traversed_loop, position)
+        row["linear_us"] = 1e6 * (time.perf_counter() - start) / len(positions)
+        start = time.perf_counter()
+        for position in positions:
+            indexed_loop_start(the_ai.traversed_loop_index, position)
+        row["indexed_us"] = 1e6 * (time.perf_counter() - start) / len(positions)
+    return row
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    worlds = [os.path.join(root, "worlds", "worldB")]
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (31, 61, 101):
+            worlds.append(worldgen.write_maze(
+                os.path.join(tmp, f"loops{size}"), size, size, 0.1, seed=size
+            ))
+
+        print(
+            f"{'world':<10} {'turns':>7} {'calls':>7} {'run_s':>8} "
+            f"{'check_us':>9} {'linear_us':>10} {'indexed_us':>11}"
+        )
+        for world_filename in worlds:
+            row = bench_world(world_filename)
+            print(
+                f"{row['world']:<10} {row['turns']:>7} {row['calls']:>7} "
+                f"{row['run_s']:>8.3f} {row['loop_check_us']:>9.1f} "
+                f"{row['linear_us']:>10.2f} {row['indexed_us']:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
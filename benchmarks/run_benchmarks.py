@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import sim
+import world
+import profiler
+import worldgen
+
+# Scalability benchmarks for the world, sim and AI hot paths. Every world is
+# timed for load_world (parsing the text and from the compiled cache),
+# get_percepts, check_triggers, AI.update and a full headless run_sim; the
+# results are compared against a stored baseline and any metric more than
+# the tolerance worse than it is reported. Timings of a few microseconds
+# must also be worse by more than a per-metric noise floor.
+#
+#   python benchmarks/run_benchmarks.py                 compare with baseline
+#   python benchmarks/run_benchmarks.py -u              rewrite the baseline
+#   python benchmarks/run_benchmarks.py -s 100 500      synthetic sizes to run
+#   python benchmarks/run_benchmarks.py -tol 0.5        allowed slowdown (50%)
+
+BASELINE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SYNTHETIC_SIZES = [100, 500, 1000]
+MAX_TURNS = 2000
+SAMPLES = 2000
+# every timing is the best of at least this many repeats, and of as many
+# more as fit in MIN_TIME_S, to keep noise out of the baseline comparison
+REPEATS = 3
+MIN_TIME_S = 0.2
+
+# metrics where a larger number is better; every other metric is a time
+HIGHER_IS_BETTER = ["turns_per_s"]
+# smallest change in seconds that counts as a regression, for the timings
+# short enough that scheduler noise alone can exceed the tolerance
+NOISE_FLOOR = {
+    "get_percepts_s": 3e-6,
+    "check_triggers_s": 1e-6,
+    "ai_update_mean_s": 2e-5,
+    "ai_update_p99_s": 2e-4,
+    "load_world_s": 1e-3,
+    "load_cached_s": 1e-3
+}
+
+def repetitions(repeats):
+    # Short timings get many more repeats than long ones, so that their
+    # best is not just the luck of a few runs.
+    start = time.perf_counter()
+    k = 0
+    while k < repeats or time.perf_counter() - start < MIN_TIME_S:
+        yield k
+        k += 1
+
+def time_load(world_filename, use_cache=False, repeats=REPEATS):
+    best = None
+    for _ in repetitions(repeats):
+        start = time.perf_counter()
+        the_world = world.World(world_filename, use_cache)
+        the_world.load_world()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return the_world, best
+
+def open_cells(the_world, samples):
+    rng = random.Random(0)
+    cells = []
+    while len(cells) < samples:
+        x = rng.randrange(the_world.get_width())
+        y = rng.randrange(the_world.get_height())
+        if the_world.is_cell_enterable(x, y):
+            cells.append((x, y))
+    return cells
+
+def time_percepts(the_world, cells, repeats=REPEATS):
+    best = None
+    for _ in repetitions(repeats):
+        start = time.perf_counter()
+        for x, y in cells:
+            sim.get_percepts(the_world, x, y, "N")
+        elapsed = (time.perf_counter() - start) / len(cells)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_triggers(the_world, cells, repeats=REPEATS):
+    commands = ["N", "E", "S", "W", "U"]
+    best = None
+    for _ in repetitions(repeats):
+        start = time.perf_counter()
+        for k, (x, y) in enumerate(cells):
+            the_world.check_triggers(x, y, commands[k % len(commands)])
+        elapsed = (time.perf_counter() - start) / len(cells)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_run(world_filename, max_turns, repeats=REPEATS):
+    best = None
+    for _ in repetitions(repeats):
+        the_world = world.World(world_filename)
+        the_world.load_world()
+        phase_profiler = profiler.PhaseProfiler()
+        start = time.perf_counter()
+        result = sim.run_sim(the_world, max_turns, quiet=True, profiler=phase_profiler)
+        elapsed = time.perf_counter() - start
+        ai_phase = phase_profiler.summary()["phases"]["ai_update"]
+        run = {
+            "turns": result["turns"],
+            "run_s": elapsed,
+            "turns_per_s": result["turns"] / elapsed if elapsed else 0.0,
+            "ai_update_mean_s": ai_phase["mean_ms"] / 1000,
+            "ai_update_p99_s": ai_phase["p99_ms"] / 1000
+        }
+        # each metric keeps its own best over the repeats
+        if best is None:
+            best = run
+        else:
+            best["run_s"] = min(best["run_s"], run["run_s"])
+            best["turns_per_s"] = max(best["turns_per_s"], run["turns_per_s"])
+            best["ai_update_mean_s"] = min(best["ai_update_mean_s"], run["ai_update_mean_s"])
+            best["ai_update_p99_s"] = min(best["ai_update_p99_s"], run["ai_update_p99_s"])
+    return best
+
+def peak_memory(world_filename, max_turns):
+    tracemalloc.start()
+    try:
+        the_world = world.World(world_filename)
+        the_world.load_world()
+        sim.run_sim(the_world, max_turns, quiet=True)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_world(world_filename, max_turns=MAX_TURNS):
+    the_world, load_s = time_load(world_filename)
+    # the first cached load writes the cache, the repeats read it
+    cached_load_s = time_load(world_filename, True, REPEATS + 1)[1]
+    cells = open_cells(the_world, SAMPLES)
+    results = {
+        "size": [the_world.get_width(), the_world.get_height()],
+        "load_world_s": load_s,
+        "load_cached_s": cached_load_s,
+        "get_percepts_s": time_percepts(the_world, cells),
+        "check_triggers_s": time_triggers(the_world, cells)
+    }
+    results.update(time_run(world_filename, max_turns))
+    results["peak_memory_bytes"] = peak_memory(world_filename, max_turns)
+    return results
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            if metric == "turns":
+                continue
+            if metric in HIGHER_IS_BETTER:
+                worse = value < old / (1 + tolerance)
+            else:
+                worse = (value > old * (1 + tolerance)
+                         and value - old > NOISE_FLOOR.get(metric, 0.0))
+            if worse:
+                regressions.append((name, metric, old, value))
+    return regressions
+
+def main():
+
+    update_baseline = False
+    baseline_filename = BASELINE_FILENAME
+    sizes = SYNTHETIC_SIZES
+    tolerance = 0.5
+    max_turns = MAX_TURNS
+
+    args = sys.argv
+
+    i = 1
+    while i < len(args):
+        try:
+            if args[i] == "-u":
+                update_baseline = True
+            elif args[i] == "-b":
+                baseline_filename = args[i+1]
+            elif args[i] == "-tol":
+                tolerance = float(args[i+1])
+            elif args[i] == "-t":
+                max_turns = int(args[i+1])
+            elif args[i] == "-s":
+                sizes = []
+                j = i + 1
+                while j < len(args) and not args[j].startswith("-"):
+                    sizes.append(int(args[j]))
+                    j += 1
+        except (IndexError, ValueError):
+            print("Incorrect command line arguments.")
+            return 2
+
+        i+=1
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        worlds = [
+            (name, os.path.join(ROOT, "worlds", name))
+            for name in ("worldA", "worldB", "worldC")
+        ]
+        for size in sizes:
+            worlds.append((
+                f"maze{size}",
+                worldgen.write_maze(os.path.join(tmp, f"maze{size}"), size, size, 0.05, seed=size)
+            ))
+
+        for name, world_filename in worlds:
+            results[name] = bench_world(world_filename, max_turns)
+            r = results[name]
+            print(
+                f"{name:<9} load {r['load_world_s'] * 1000:9.2f} ms  "
+                f"cached {r['load_cached_s'] * 1000:8.2f} ms  "
+                f"percepts {r['get_percepts_s'] * 1e6:7.2f} us  "
+                f"triggers {r['check_triggers_s'] * 1e6:7.2f} us  "
+                f"ai {r['ai_update_mean_s'] * 1e6:8.1f} us  "
+                f"{r['turns_per_s']:9.0f} turns/s  "
+                f"peak {r['peak_memory_bytes'] / 2**20:7.1f} MiB"
+            )
+
+    if update_baseline:
+        with open(baseline_filename, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {baseline_filename}")
+        return 0
+
+    if not os.path.exists(baseline_filename):
+        print(f"No baseline at {baseline_filename}; run with -u to create one.")
+        return 0
+
+    with open(baseline_filename, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, tolerance)
+    for name, metric, old, new in regressions:
+        print(f"REGRESSION {name} {metric}: {old:.6g} -> {new:.6g}")
+    if not regressions:
+        print(f"No regressions beyond {tolerance:.0%} of the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import random
+
+# Generates mazes in the world file format for benchmarking. A perfect maze
+# is carved with a randomized depth-first search, then loop_fraction of the
+# remaining interior walls between two corridors are knocked out to make
+# worldB-style loops. The agent starts at 1 1 facing N; the exit is placed
+# in the far corner.
+
+def generate_maze(width, height, loop_fraction=0.0, seed=0):
+    width -= (width + 1) % 2
+    height -= (height + 1) % 2
+    rng = random.Random(seed)
+    grid = [['w'] * width for _ in range(height)]
+
+    grid[1][1] = 'g'
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [
+            (x + dx, y + dy, dx // 2, dy // 2)
+            for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+            if 0 < x + dx < width - 1
+            and 0 < y + dy < height - 1
+            and grid[y + dy][x + dx] == 'w'
+        ]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny, hx, hy = rng.choice(options)
+        grid[y + hy][x + hx] = 'g'
+        grid[ny][nx] = 'g'
+        stack.append((nx, ny))
+
+    if loop_fraction > 0:
+        walls = [
+            (x, y)
+            for y in range(1, height - 1)
+            for x in range(1, width - 1)
+            if grid[y][x] == 'w'
+            and (
+                (grid[y][x - 1] == 'g' and grid[y][x + 1] == 'g')
+                or (grid[y - 1][x] == 'g' and grid[y + 1][x] == 'g')
+            )
+        ]
+        for x, y in rng.sample(walls, int(len(walls) * loop_fraction)):
+            grid[y][x] = 'g'
+
+    grid[height - 2][width - 2] = 'r'
+
+    lines = ["1 1", "N"]
+    lines += [" ".join(row) for row in grid]
+    return "\n".join(lines) + "\n"
+
+def write_maze(filename, width, height, loop_fraction=0.0, seed=0):
+    with open(filename, 'w') as f:
+        f.write(generate_maze(width, height, loop_fraction, seed))
+    return filename
@@ -0,0 +1,20 @@
+import os
+import pickle
+
+# Checkpoints are pickles, so only resume from files you wrote yourself.
+
+def save_checkpoint(filename, state):
+    # Written to a temporary file and renamed into place, so a run killed
+    # mid-write leaves the previous checkpoint intact.
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def load_checkpoint(filename):
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,40 @@
+class CycleDetector:
+    """
+    Spots a run that has settled into a loop. run_sim feeds it one key per
+    turn (the agent's position, its command and the world's version) and
+    it reports a cycle once the last keys have repeated with some period p
+    for at least max(repeats * p, min_turns) turns in a row.
+
+    For every period p seen so far it keeps a run length: how many turns
+    in a row have matched the turn p turns earlier. A turn that breaks the
+    pattern drops that period; a key seen before starts tracking the gap
+    since its last occurrence as a new period.
+    """
+
+    def __init__(self, repeats=3, min_turns=100):
+        self.repeats = repeats
+        self.min_turns = min_turns
+        self.history = []
+        self.last_seen = {}
+        self.runs = {}
+        self.period = None
+
+    def update(self, key):
+        turn = len(self.history)
+        self.history.append(key)
+        previous = self.last_seen.get(key)
+        self.last_seen[key] = turn
+
+        runs = {}
+        for period, run in self.runs.items():
+            if self.history[turn - period] == key:
+                runs[period] = run + 1
+        if previous is not None:
+            runs.setdefault(turn - previous, 1)
+        self.runs = runs
+
+        for period, run in runs.items():
+            if run >= max(self.repeats * period, self.min_turns):
+                self.period = period
+                return True
+        return False
@@ -1,6 +1,8 @@
+import numpy as np
 import pygame
+import display_backends
 
-class Display:
+class Display(display_backends.DisplayBackend):
     def __init__(self, the_world, agent_x, agent_y):
         self.cell_size = 30
         self.screen_w = self.cell_size * the_world.get_width()
@@ -12,25 +14,7 @@ class Display:
         self.font_name = "cmuttr.ttf"
         self.agent_color = "#FFFFFF"
         self.agent_facing_color = "#000000"
-        self.color_key = {
-            'w':'#000000',
-            'b':'#0b63d6',
-            'o':'#fc9d03',
-            'r':'#ab3307',
-            'g':'#59eb05',
-            'p':'#c708c4',
-            'y':'#ffff03',
-            '0':'#59eb05',
-            '1':'#59eb05',
-            '2':'#59eb05',
-            '3':'#59eb05',
-            '4':'#59eb05',
-            '5':'#59eb05',
-            '6':'#59eb05',
-            '7':'#59eb05',
-            '8':'#59eb05',
-            '9':'#59eb05',
-        }
+        self.color_key = dict(display_backends.CELL_COLORS)
         self.text = [
             '0', '1', '2', '3', '4',
             '5', '6', '7', '8', '9'
@@ -48,37 +32,61 @@ class Display:
             self.font_name, 
             self.font_size
         )
+        self.glyphs = {cell: self.font.render(cell) for cell in self.text}
+
+        # The world is drawn once onto a background surface. Each update
+        # redraws only the cells whose code changed since the last frame,
+        # plus the cells the agent left and entered.
+        self.background = pygame.Surface((self.screen_w, self.screen_h))
+        self.cells = the_world.world_map.copy()
+        for y in range(0, self.cells_h):
+            for x in range(0, self.cells_w):
+                self.draw_cell(x, y, self.world.get_cell(x, y))
+        self.screen.blit(self.background, (0, 0))
+        self.first_frame = True
+
+    def cell_rect(self, x, y):
+        return pygame.Rect(
+            x*self.cell_size,
+            y*self.cell_size,
+            self.cell_size,
+            self.cell_size
+        )
+
+    def draw_cell(self, x, y, cell):
+        pygame.draw.rect(
+            self.background,
+            self.color_key[cell],
+            self.cell_rect(x, y)
+        )
+        if cell in self.glyphs:
+            surface, rect = self.glyphs[cell]
+            self.background.blit(
+                surface,
+                (
+                    x*self.cell_size + self.cell_size//2 - rect.w//2,
+                    y*self.cell_size + self.cell_size//2 - rect.h//2
+                )
+            )
 
     def update(self, agent_x, agent_y, facing):
         for event in pygame.event.get():
             pass
 
+        dirty = [
+            self.cell_rect(self.agent_x, self.agent_y),
+            self.cell_rect(agent_x, agent_y)
+        ]
+        ys, xs = np.nonzero(self.world.world_map != self.cells)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.draw_cell(x, y, self.world.get_cell(x, y))
+            dirty.append(self.cell_rect(x, y))
+        self.cells[ys, xs] = self.world.world_map[ys, xs]
+        for rect in dirty:
+            self.screen.blit(self.background, rect, rect)
+
         self.agent_x = agent_x
         self.agent_y = agent_y
-        self.screen.fill("black")
-        for x in range(0, self.cells_w):
-            for y in range(0, self.cells_h):
-                if self.world.is_valid_cell(x, y):
-                    cell = self.world.get_cell(x, y)
-                    pygame.draw.rect(
-                        self.screen,
-                        self.color_key[cell],
-                        pygame.Rect(
-                            x*self.cell_size,
-                            y*self.cell_size,
-                            x*self.cell_size+self.cell_size,
-                            y*self.cell_size+self.cell_size
-                        )
-                    )
-                    if cell in self.text:
-                        surface, rect = self.font.render(cell)
-                        self.screen.blit(
-                            surface,
-                            (
-                                x*self.cell_size + self.cell_size//2 - rect.w//2,
-                                y*self.cell_size + self.cell_size//2 - rect.h//2
-                            )
-                        )
         cx = self.agent_x*self.cell_size + self.cell_size//2
         cy = self.agent_y*self.cell_size + self.cell_size//2
         pygame.draw.circle(
@@ -104,7 +112,11 @@ class Display:
             2
         )
 
-        pygame.display.flip()
+        if self.first_frame:
+            pygame.display.flip()
+            self.first_frame = False
+        else:
+            pygame.display.update(dirty)
 
     def quit(self):
         pygame.quit()
@@ -0,0 +1,63 @@
+import importlib
+
+# Colors shared by the display backends.
+CELL_COLORS = {
+    'w': '#000000',
+    'b': '#0b63d6',
+    'o': '#fc9d03',
+    'r': '#ab3307',
+    'g': '#59eb05',
+    'p': '#c708c4',
+    'y': '#ffff03',
+    '0': '#59eb05',
+    '1': '#59eb05',
+    '2': '#59eb05',
+    '3': '#59eb05',
+    '4': '#59eb05',
+    '5': '#59eb05',
+    '6': '#59eb05',
+    '7': '#59eb05',
+    '8': '#59eb05',
+    '9': '#59eb05',
+}
+
+# Backend name -> (module, class). Modules are only imported when their
+# backend is chosen, so headless runs never import pygame.
+BACKENDS = {
+    "none": ("display_backends", "NullDisplay"),
+    "pygame": ("display", "Display"),
+    "ansi": ("ansi_display", "AnsiDisplay")
+}
+
+class DisplayBackend:
+    """
+    Interface every display backend implements. A backend is built with
+    the world and the agent's starting cell, is told the agent's state
+    after every drawn turn and reads any changed cells from the world
+    itself.
+    """
+
+    def __init__(self, the_world, agent_x, agent_y):
+        self.world = the_world
+        self.agent_x = agent_x
+        self.agent_y = agent_y
+
+    def update(self, agent_x, agent_y, facing):
+        raise NotImplementedError
+
+    def quit(self):
+        pass
+
+class NullDisplay(DisplayBackend):
+    def update(self, agent_x, agent_y, facing):
+        self.agent_x = agent_x
+        self.agent_y = agent_y
+
+def create_display(name, the_world, agent_x, agent_y):
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown display backend {name}. Choose from: {', '.join(BACKENDS)}"
+        )
+    module_name, class_name = BACKENDS[name]
+    backend = getattr(importlib.import_module(module_name), class_name)
+    return backend(the_world, agent_x, agent_y)
@@ -0,0 +1,154 @@
+from collections import deque
+
+
+class FrontierAI:
+    # initialize agent parameters
+    def __init__(self):
+        """
+        Planner that explores with the map it has built so far. A known open
+        tile with an unknown neighbor is on the frontier; the agent walks
+        the shortest known path (BFS) to the nearest one, or to the exit or
+        an unused goal once it has seen one.
+        """
+        # variable to define possible agent movement
+        self.valid_moves = ["N", "E", "S", "W"]
+        # variable to define corresponding movement position adjustment
+        self.direction_To_Coord = {
+            "N": (0, -1),
+            "E": (1, 0),
+            "S": (0, 1),
+            "W": (-1, 0),
+        }
+
+        # variable to record current tile position (relative to the start)
+        self.position = (0, 0)
+
+        # variable to record every tile seen so far
+        self.map = {}
+
+        # variable to record tiles the agent has stood on
+        self.visited = set()
+
+        # variable to record known open tiles with an unknown neighbor
+        self.frontier = set()
+
+        # variable to define goal tile types
+        self.goal_cells = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+
+        # variable to record visible goal and exit tiles
+        self.goals = set()
+        self.exit = None
+
+        # variables to record the cached path and the tile it leads to
+        self.path = deque()
+        self.target = None
+
+    def calculate_position(self, origin, move):
+        dx, dy = self.direction_To_Coord[move]
+        return (origin[0] + dx, origin[1] + dy)
+
+    # function to check if a tile is still worth exploring
+    def is_frontier(self, coord):
+        if coord in self.visited or self.map.get(coord, "w") == "w":
+            return False
+        return any(
+            self.calculate_position(coord, move) not in self.map
+            for move in self.valid_moves
+        )
+
+    # function to record a tile and keep the frontier up to date around it
+    def record_tile(self, coord, cell):
+        if self.map.get(coord) == cell:
+            return False
+        self.map[coord] = cell
+        if cell == "r":
+            self.exit = coord
+        elif cell in self.goal_cells:
+            self.goals.add(coord)
+        else:
+            self.goals.discard(coord)
+        for tile in [coord] + [
+            self.calculate_position(coord, move) for move in self.valid_moves
+        ]:
+            if self.is_frontier(tile):
+                self.frontier.add(tile)
+            else:
+                self.frontier.discard(tile)
+        return cell == "w"
+
+    # function to add the percepts to the map; reports if a new wall was seen
+    def map_location(self, percepts):
+        new_wall = False
+        self.visited.add(self.position)
+        self.frontier.discard(self.position)
+        self.record_tile(self.position, percepts["X"][0])
+        for move in self.valid_moves:
+            base_position = self.position
+            for cell in percepts[move]:
+                base_position = self.calculate_position(base_position, move)
+                if self.record_tile(base_position, cell):
+                    new_wall = True
+        return new_wall
+
+    # function to pick the set of tiles to head for, most urgent first
+    def current_targets(self):
+        if self.goals:
+            return self.goals
+        if self.exit is not None:
+            return {self.exit}
+        return self.frontier
+
+    # function to find the shortest known path to the nearest target
+    def plan(self, targets):
+        parents = {self.position: None}
+        queue = deque([self.position])
+        while queue:
+            coord = queue.popleft()
+            if coord in targets:
+                target = coord
+                moves = deque()
+                while parents[coord] is not None:
+                    coord, move = parents[coord]
+                    moves.appendleft(move)
+                return moves, target
+            for move in self.valid_moves:
+                new_position = self.calculate_position(coord, move)
+                if new_position in parents or self.map.get(new_position, "w") == "w":
+                    continue
+                parents[new_position] = (coord, move)
+                queue.append(new_position)
+        return deque(), None
+
+    # function to repeatedly perform agent action
+    def update(self, percepts):
+        """
+        Same interface as ai.AI.update: takes the percepts dictionary for
+        this turn and returns one of N, E, S, W, U.
+        """
+        new_wall = self.map_location(percepts)
+
+        # use the exit or an unused goal when standing on it
+        if percepts["X"][0] == "r":
+            return "U"
+        if percepts["X"][0] in self.goal_cells:
+            # every tile with this digit turns into a plain tile
+            for coord in list(self.goals):
+                if self.map[coord] == percepts["X"][0]:
+                    self.map[coord] = "g"
+                    self.goals.discard(coord)
+            self.path.clear()
+            return "U"
+
+        targets = self.current_targets()
+        # the cached path is kept until a new wall shows up or its target
+        # stops being worth visiting
+        if new_wall or not self.path or self.target not in targets:
+            self.path, self.target = self.plan(targets)
+
+        if not self.path:
+            # nothing reachable is left to explore
+            return "U"
+
+        move = self.path.popleft()
+        self.position = self.calculate_position(self.position, move)
+        return move
@@ -0,0 +1,46 @@
+import time
+
+class LogWriter:
+    """
+    Collects log lines in memory and writes them to the wrapped file in
+    large chunks, instead of one write and flush per line. The buffer is
+    flushed once it holds buffer_size characters, when flush_interval
+    seconds have passed since the last flush (if set), and on close.
+    """
+
+    def __init__(self, log_file, buffer_size=65536, flush_interval=None):
+        self.log_file = log_file
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+        elif self.flush_interval is not None:
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.log_file.write("".join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+        self.log_file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.log_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -2,20 +2,49 @@ import sys
 import world
 import misc
 import sim
+import batch
+import multi_sim
+import logwriter
+import profiler
+import checkpoint
+import display_backends
 
 def main():
 
     world_filename = None
     log_filename = None
+    trace_filename = None
+    trace = None
     log = None
+    log_buffer_size = 65536
+    log_flush_interval = None
     max_turns = None
     the_world = None
     use_display = False
     display_speed = 0.5
+    max_fps = None
+    render_every = 1
+    display_backend = "pygame"
+    ai_mode = "dfs"
+    ai_deadline = None
+    stop_on_deadline = False
+    profile_filename = None
+    phase_profiler = None
+    batch_worlds = []
+    batch_runs = 1
+    batch_workers = None
+    summary_filename = None
+    agent_starts = []
+    checkpoint_filename = None
+    checkpoint_every = None
+    resume_filename = None
+    resume = None
+    detect_cycles = False
+    use_cache = True
 
     args = sys.argv
 
-    if "-w" not in args:
+    if "-w" not in args and "-b" not in args and "-rs" not in args:
         print("Map argument missing. Run with -h for help.")
 
     if "-h" in args:
@@ -28,35 +57,182 @@ def main():
                 world_filename = args[i+1]
             elif args[i] == "-l":
                 log_filename = args[i+1]
+            elif args[i] == "-tr":
+                trace_filename = args[i+1]
+            elif args[i] == "-lb":
+                log_buffer_size = int(args[i+1])
+            elif args[i] == "-lf":
+                log_flush_interval = float(args[i+1])
             elif args[i] == "-d":
                 use_display = True
                 try:
                     display_speed = float(args[i+1])
                 except:
                     pass
+            elif args[i] == "-db":
+                use_display = True
+                display_backend = args[i+1]
+                if display_backend not in display_backends.BACKENDS:
+                    print(
+                        f"Unknown display backend {display_backend}. "
+                        f"Choose from: {', '.join(display_backends.BACKENDS)}"
+                    )
+                    return
+            elif args[i] == "-fps":
+                max_fps = float(args[i+1])
+            elif args[i] == "-fe":
+                render_every = int(args[i+1])
             elif args[i] == "-t":
                 try:
                     max_turns = int(args[i+1])
                 except TypeError:
                     print(f"max turns must be an int: {args[i+1]}")
+            elif args[i] == "-a":
+                ai_mode = args[i+1]
+                if ai_mode not in sim.AI_MODES:
+                    print(f"Unknown AI mode {ai_mode}. Choose from: {', '.join(sim.AI_MODES)}")
+                    return
+            elif args[i] == "-dl":
+                ai_deadline = float(args[i+1])
+            elif args[i] == "-ds":
+                stop_on_deadline = True
+            elif args[i] == "-p":
+                profile_filename = args[i+1]
+            elif args[i] == "-b":
+                j = i + 1
+                while j < len(args) and not args[j].startswith("-"):
+                    batch_worlds.append(args[j])
+                    j += 1
+            elif args[i] == "-n":
+                batch_runs = int(args[i+1])
+            elif args[i] == "-j":
+                batch_workers = int(args[i+1])
+            elif args[i] == "-o":
+                summary_filename = args[i+1]
+            elif args[i] == "-ms":
+                j = i + 1
+                while j < len(args) and not args[j].startswith("-"):
+                    try:
+                        agent_starts.append(multi_sim.parse_start(args[j]))
+                    except ValueError as e:
+                        print(e)
+                        return
+                    j += 1
+            elif args[i] == "-cp":
+                checkpoint_filename = args[i+1]
+            elif args[i] == "-ce":
+                checkpoint_every = int(args[i+1])
+            elif args[i] == "-rs":
+                resume_filename = args[i+1]
+            elif args[i] == "-cy":
+                detect_cycles = True
+            elif args[i] == "-nc":
+                use_cache = False
         except IndexError:
             print("Incorrect command line arguments. Run with -h for help.")
             return
 
         i+=1
 
+    if batch_worlds:
+        summary = None
+        if summary_filename is not None:
+            summary = open(summary_filename, 'w', newline='')
+        try:
+            batch.run_batch(
+                batch_worlds,
+                batch_runs,
+                max_turns,
+                summary,
+                batch_workers,
+                ai_mode,
+                use_cache
+            )
+        finally:
+            if summary is not None:
+                summary.close()
+        return
+
+    if agent_starts:
+        summary = None
+        if summary_filename is not None:
+            summary = open(summary_filename, 'w', newline='')
+        try:
+            the_world = world.World(world_filename, use_cache)
+            the_world.load_world()
+            results = multi_sim.run_multi_sim(
+                the_world,
+                agent_starts,
+                max_turns,
+                ai_mode
+            )
+            multi_sim.write_summary(results, summary)
+        except (misc.InvalidCellException, misc.InvalidWorldException) as e:
+            print(e)
+        finally:
+            if summary is not None:
+                summary.close()
+        return
+
+    if checkpoint_every is not None and checkpoint_filename is None:
+        print("A checkpoint file (-cp) is needed with -ce.")
+        return
+
+    if checkpoint_every is not None and checkpoint_every < 1:
+        print("The checkpoint interval (-ce) must be at least 1 turn.")
+        return
+
+    # The world and AI mode come from the checkpoint unless -w is given.
+    if resume_filename is not None:
+        resume = checkpoint.load_checkpoint(resume_filename)
+        if world_filename is None:
+            world_filename = resume["world"]
+        ai_mode = resume["ai_mode"]
+
     if log_filename is not None:
-        log = open(log_filename, 'w')
+        log = logwriter.LogWriter(
+            open(log_filename, 'w'),
+            log_buffer_size,
+            log_flush_interval
+        )
+
+    if trace_filename is not None:
+        trace = logwriter.LogWriter(open(trace_filename, 'w'), log_buffer_size)
         
+    if profile_filename is not None:
+        phase_profiler = profiler.PhaseProfiler()
+
     try:
-        the_world = world.World(world_filename)
+        the_world = world.World(world_filename, use_cache)
         the_world.load_world()
-        sim.run_sim(the_world, max_turns, log, use_display, display_speed)
-    except misc.InvalidCellException as e:
+        sim.run_sim(
+            the_world,
+            max_turns,
+            log,
+            use_display,
+            display_speed,
+            trace=trace,
+            ai_mode=ai_mode,
+            ai_deadline=ai_deadline,
+            stop_on_deadline=stop_on_deadline,
+            profiler=phase_profiler,
+            max_fps=max_fps,
+            render_every=render_every,
+            display_backend=display_backend,
+            checkpoint_filename=checkpoint_filename,
+            checkpoint_every=checkpoint_every,
+            resume=resume,
+            detect_cycles=detect_cycles
+        )
+    except (misc.InvalidCellException, misc.InvalidWorldException) as e:
         print(e)
     finally:
         if log is not None:
             log.close()
+        if trace is not None:
+            trace.close()
+        if phase_profiler is not None:
+            phase_profiler.write(profile_filename)
 
 
 
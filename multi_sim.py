@@ -0,0 +1,169 @@
+import csv
+import sys
+import time
+import numpy as np
+import world
+import misc
+import sim
+
+SUMMARY_FIELDS = [
+    "agent", "start_x", "start_y", "turns", "score", "ai_state",
+    "ai_p99_ms", "ai_max_ms"
+]
+
+class Agent:
+    """
+    State for one agent in a multi-agent run. The world is shared and never
+    changed, so everything a run would normally write into it is kept here:
+    the goal digits this agent has used (which read as 'g' for it) and its
+    door state.
+    """
+
+    def __init__(self, the_world, ai_mode, x, y, facing):
+        self.ai = sim.AI_MODES[ai_mode]()
+        self.start = (x, y)
+        self.x = x
+        self.y = y
+        self.facing = facing
+        self.points = 1000
+        self.ai_state = 'GOOD'
+        self.turns = 0
+        self.latencies = []
+        self.used_goals = set()
+        self.doors_closed = the_world.doors_closed
+
+    def view(self, cells):
+        # The cells as this agent sees them.
+        if not self.used_goals:
+            return cells
+        return ['g' if cell in self.used_goals else cell for cell in cells]
+
+def get_all_percepts(the_world, agents):
+    # The ray lengths for every agent come from one gather per direction;
+    # goal swaps never move walls, so the shared tables hold for all agents.
+    xs = np.array([agent.x for agent in agents])
+    ys = np.array([agent.y for agent in agents])
+    lengths = {
+        d: the_world.ray_lengths[d][ys, xs].tolist() for d in sim.DIRECTIONS
+    }
+    all_percepts = []
+    for k, agent in enumerate(agents):
+        percepts = {'X': agent.view([the_world.get_cell(agent.x, agent.y)])}
+        for d in sim.DIRECTIONS:
+            percepts[d] = agent.view(
+                the_world.ray_cells(agent.x, agent.y, d, lengths[d][k])
+            )
+        all_percepts.append(percepts)
+    return all_percepts
+
+def check_agent_triggers(the_world, agent, cmd):
+    # Like World.check_triggers, but a goal is only used up for this agent.
+    cell = the_world.get_cell(agent.x, agent.y)
+    if cell in world.World.GOAL_CELLS:
+        if cmd != "U" or cell in agent.used_goals:
+            return ["NONE"]
+        agent.used_goals.add(cell)
+        remaining = sum(
+            len(the_world.positions_of(goal))
+            for goal in world.World.GOAL_CELLS
+            if goal not in agent.used_goals
+        )
+        return ["GOAL_TRIGGERED", remaining, cell]
+    return the_world.check_triggers(agent.x, agent.y, cmd)
+
+def step_agent(the_world, agent, percepts):
+    update_start = time.perf_counter()
+    agent_cmd = agent.ai.update(percepts)
+    agent.latencies.append(time.perf_counter() - update_start)
+
+    if not sim.validate_agent_cmd(agent_cmd):
+        agent.ai_state = 'BAD'
+        return
+
+    if agent_cmd in sim.DIRECTIONS:
+        dx, dy = sim.DIRECTIONS[agent_cmd]
+        if the_world.is_cell_enterable(agent.x + dx, agent.y + dy):
+            agent.x += dx
+            agent.y += dy
+
+    trigger = check_agent_triggers(the_world, agent, agent_cmd)
+    match trigger[0]:
+        case "EXIT":
+            agent.ai_state = 'EXITED'
+        case "TELEPORT":
+            agent.x = trigger[1]
+            agent.y = trigger[2]
+        case "DOORS_OPEN":
+            agent.doors_closed = False
+        case "GOAL_TRIGGERED":
+            agent.points += sim.POINTS_PER_GOAL
+
+def run_multi_sim(the_world, starts, max_turns=None, ai_mode="dfs"):
+    """
+    Runs one independent agent per (x, y) or (x, y, facing) start in the
+    same loaded world and returns one result per agent, in the same form
+    as run_sim's. Each agent scores exactly as it would alone.
+    """
+    agents = []
+    for start in starts:
+        x, y = start[0], start[1]
+        facing = start[2] if len(start) > 2 else the_world.get_start_face_dir()
+        if not the_world.is_cell_enterable(x, y):
+            raise misc.InvalidWorldException(
+                f"Agent start {x},{y} is not an open cell."
+            )
+        agents.append(Agent(the_world, ai_mode, x, y, facing))
+
+    turn = 1
+    active = list(agents)
+    while active:
+        all_percepts = get_all_percepts(the_world, active)
+        for agent, percepts in zip(active, all_percepts):
+            step_agent(the_world, agent, percepts)
+            agent.turns = turn
+            if max_turns is None or turn < max_turns:
+                agent.points -= 1
+
+        if max_turns is not None and turn >= max_turns:
+            break
+        active = [agent for agent in active if agent.ai_state == 'GOOD']
+        turn += 1
+
+    return [
+        {
+            "start": list(agent.start),
+            "turns": agent.turns,
+            "score": agent.points,
+            "ai_state": agent.ai_state,
+            "latency": sim.latency_summary(agent.latencies)
+        }
+        for agent in agents
+    ]
+
+def parse_start(text):
+    # "x,y" or "x,y,F"
+    parts = text.split(",")
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] not in sim.FACINGS):
+        raise ValueError(f"Invalid agent start: {text}")
+    try:
+        return (int(parts[0]), int(parts[1])) + tuple(parts[2:])
+    except ValueError:
+        raise ValueError(f"Invalid agent start: {text}")
+
+def write_summary(results, summary=None):
+    writer = csv.DictWriter(
+        summary if summary is not None else sys.stdout,
+        fieldnames=SUMMARY_FIELDS
+    )
+    writer.writeheader()
+    for k, result in enumerate(results):
+        writer.writerow({
+            "agent": k,
+            "start_x": result["start"][0],
+            "start_y": result["start"][1],
+            "turns": result["turns"],
+            "score": result["score"],
+            "ai_state": result["ai_state"],
+            "ai_p99_ms": round(result["latency"]["p99"] * 1000, 3),
+            "ai_max_ms": round(result["latency"]["max"] * 1000, 3)
+        })
@@ -0,0 +1,63 @@
+import csv
+import json
+import time
+import sim
+
+class PhaseProfiler:
+    """
+    Records how long each phase of every simulation turn takes. run_sim
+    calls start_turn, then mark(phase) at the end of each phase, then
+    end_turn. Time is charged to the phase named in mark since the previous
+    mark, so a phase marked twice in one turn accumulates.
+    """
+
+    PHASES = ["get_percepts", "ai_update", "move", "log", "display", "checkpoint"]
+
+    def __init__(self):
+        self.turn_times = {phase: [] for phase in PhaseProfiler.PHASES}
+        self.current = None
+        self.last = 0.0
+
+    def start_turn(self):
+        self.current = dict.fromkeys(PhaseProfiler.PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_turn(self):
+        for phase, elapsed in self.current.items():
+            self.turn_times[phase].append(elapsed)
+        self.current = None
+
+    def summary(self):
+        turns = len(self.turn_times[PhaseProfiler.PHASES[0]])
+        totals = {phase: sum(times) for phase, times in self.turn_times.items()}
+        grand_total = sum(totals.values())
+        phases = {}
+        for phase, times in self.turn_times.items():
+            # the same percentiles run_sim reports for AI latency
+            latency = sim.latency_summary(times)
+            phases[phase] = {
+                "total_s": totals[phase],
+                "share": totals[phase] / grand_total if grand_total else 0.0,
+                "mean_ms": 1000 * totals[phase] / turns if turns else 0.0,
+                "p99_ms": 1000 * latency["p99"],
+                "max_ms": 1000 * latency["max"]
+            }
+        return {"turns": turns, "total_s": grand_total, "phases": phases}
+
+    def write(self, filename):
+        summary = self.summary()
+        with open(filename, 'w', newline='') as f:
+            if filename.endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(["phase", "total_s", "share", "mean_ms", "p99_ms", "max_ms"])
+                for phase, stats in summary["phases"].items():
+                    writer.writerow([phase] + [stats[k] for k in (
+                        "total_s", "share", "mean_ms", "p99_ms", "max_ms"
+                    )])
+            else:
+                json.dump(summary, f, indent=2)
@@ -0,0 +1,48 @@
+import time
+
+class Renderer:
+    """
+    Sits between run_sim and a display so that the simulation is not tied
+    to the speed of drawing. run_sim hands over the agent's state every
+    turn; a frame is only drawn when the turn is a multiple of every and at
+    least 1 / max_fps seconds have passed since the last frame. Turns in
+    between are skipped, and finish always draws the latest state.
+
+    delay is the pause after each drawn frame (the old display_speed). It
+    only applies with no frame cap and every == 1, where every turn is
+    drawn as before; otherwise the cap paces the frames and the simulation
+    never waits on the display.
+    """
+
+    def __init__(self, disp, delay=0.0, max_fps=None, every=1):
+        self.disp = disp
+        self.delay = delay if not max_fps and every <= 1 else 0.0
+        self.min_interval = 1 / max_fps if max_fps else 0.0
+        self.every = max(every, 1)
+        self.last_frame = None
+        self.pending = None
+        self.frames = 0
+        self.skipped = 0
+
+    def draw(self, agent_x, agent_y, facing):
+        self.disp.update(agent_x, agent_y, facing)
+        self.last_frame = time.perf_counter()
+        self.pending = None
+        self.frames += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    def update(self, turn, agent_x, agent_y, facing):
+        self.pending = (agent_x, agent_y, facing)
+        if turn % self.every != 0:
+            self.skipped += 1
+            return
+        if (self.last_frame is not None
+                and time.perf_counter() - self.last_frame < self.min_interval):
+            self.skipped += 1
+            return
+        self.draw(agent_x, agent_y, facing)
+
+    def finish(self):
+        if self.pending is not None:
+            self.draw(*self.pending)
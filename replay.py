@@ -0,0 +1,120 @@
+import sys
+import json
+import time
+from collections import Counter
+import world
+import display_backends
+
+def read_trace(trace_filename):
+    header = None
+    turns = []
+    final = None
+    with open(trace_filename, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            if "turn" in record:
+                turns.append(record)
+            elif "world" in record:
+                header = record
+            else:
+                final = record
+    return header, turns, final
+
+def trace_stats(header, turns, final):
+    commands = Counter(record["command"] for record in turns)
+    triggers = Counter(
+        record["trigger"][0] for record in turns if record["trigger"] is not None
+    )
+    visits = Counter(tuple(record["end"]) for record in turns)
+    stats = {
+        "world": header["world"] if header is not None else None,
+        "turns": len(turns),
+        "commands": dict(commands),
+        "triggers": dict(triggers),
+        "cells_visited": len(visits),
+        "most_visits": max(visits.values()) if visits else 0
+    }
+    if final is not None:
+        stats.update(final)
+    return stats
+
+def replay_display(
+    header,
+    turns,
+    world_filename=None,
+    display_speed=0.5,
+    display_backend="pygame"
+):
+    the_world = world.World(world_filename or header["world"])
+    the_world.load_world()
+    agent_x, agent_y = header["start"]
+    facing = header["facing"]
+
+    disp = display_backends.create_display(
+        display_backend, the_world, agent_x, agent_y
+    )
+    disp.update(agent_x, agent_y, facing)
+    time.sleep(display_speed)
+
+    # Goal swaps are the only world changes a run makes, so they are
+    # re-applied from the recorded triggers instead of asking the AI.
+    for record in turns:
+        trigger = record["trigger"]
+        if trigger is not None and trigger[0] == "GOAL_TRIGGERED":
+            the_world.swap_all_cells(trigger[2], "g")
+        agent_x, agent_y = record["end"]
+        disp.update(agent_x, agent_y, facing)
+        time.sleep(display_speed)
+
+    disp.quit()
+
+def main():
+
+    trace_filename = None
+    world_filename = None
+    use_display = False
+    display_speed = 0.5
+    display_backend = "pygame"
+
+    args = sys.argv
+
+    if "-r" not in args:
+        print("Trace argument missing. Run with -r <trace file>.")
+        return
+
+    i = 1
+    while i < len(args):
+        try:
+            if args[i] == "-r":
+                trace_filename = args[i+1]
+            elif args[i] == "-w":
+                world_filename = args[i+1]
+            elif args[i] == "-d":
+                use_display = True
+                try:
+                    display_speed = float(args[i+1])
+                except:
+                    pass
+            elif args[i] == "-db":
+                use_display = True
+                display_backend = args[i+1]
+        except IndexError:
+            print("Incorrect command line arguments.")
+            return
+
+        i+=1
+
+    header, turns, final = read_trace(trace_filename)
+
+    # The none backend draws nothing, so there is nothing to play back.
+    if use_display and display_backend != "none":
+        replay_display(
+            header, turns, world_filename, display_speed, display_backend
+        )
+
+    for k, v in trace_stats(header, turns, final).items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
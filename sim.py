@@ -1,7 +1,13 @@
 import world
 import ai
-import display
+import frontier_ai
+import renderer
+import checkpoint
+import cycles
+import display_backends
 import time
+import json
+import math
 
 DIRECTIONS = {
     "N": (0, -1),
@@ -21,15 +27,38 @@ VALID_COMMANDS = [
 
 POINTS_PER_GOAL = 100
 
+AI_MODES = {
+    "dfs": ai.AI,
+    "frontier": frontier_ai.FrontierAI
+}
+
 def run_sim(
     the_world, 
     max_turns=None, 
     log=None, 
     use_display=False,
-    display_speed=0.5
+    display_speed=0.5,
+    quiet=False,
+    trace=None,
+    ai_mode="dfs",
+    ai_deadline=None,
+    stop_on_deadline=False,
+    profiler=None,
+    max_fps=None,
+    render_every=1,
+    display_backend="pygame",
+    checkpoint_filename=None,
+    checkpoint_every=None,
+    resume=None,
+    detect_cycles=False
 ):
 
-    the_ai = ai.AI()
+    if checkpoint_every is not None and checkpoint_filename is None:
+        raise ValueError("checkpoint_every needs a checkpoint_filename.")
+    if checkpoint_every is not None and checkpoint_every < 1:
+        raise ValueError("checkpoint_every must be at least 1.")
+
+    the_ai = AI_MODES[ai_mode]()
 
     agent_x, agent_y = the_world.get_startxy()
     agent_facing = the_world.get_start_face_dir()
@@ -39,75 +68,146 @@ def run_sim(
     percepts = {}
     ai_state = 'GOOD'
     points = 1000
+    turns_taken = 0
+    ai_latencies = []
+    deadline_misses = 0
+    cycle_detector = cycles.CycleDetector() if detect_cycles else None
+
+    # Pick up where a checkpoint left off: the world's cells, the agent
+    # and the AI are put back as they were at the start of that turn.
+    if resume is not None:
+        the_world.apply_map(resume["world_map"])
+        # apply_map bumps the version once per changed cell; put back the
+        # saved one so it lines up with the cycle detector's history
+        the_world.version = resume["world_version"]
+        the_world.doors_closed = resume["doors_closed"]
+        the_ai = resume["ai"]
+        agent_x, agent_y = resume["agent_x"], resume["agent_y"]
+        agent_facing = resume["agent_facing"]
+        turn = resume["turn"]
+        ai_state = resume["ai_state"]
+        points = resume["points"]
+        turns_taken = turn - 1
+        ai_latencies = resume["ai_latencies"]
+        deadline_misses = resume["deadline_misses"]
+        if detect_cycles and resume.get("cycles") is not None:
+            cycle_detector = resume["cycles"]
 
     disp = None
 
+    # The none backend draws nothing, so it gets no renderer and no pauses.
+    if display_backend == "none":
+        use_display = False
+
+    # The ANSI display draws on stdout, where the turn log would otherwise
+    # be printed over the map, so without a log file nothing is logged.
+    if use_display and display_backend == "ansi" and log is None:
+        quiet = True
+
     if use_display:
-        import display
-        disp = display.Display(
+        disp = display_backends.create_display(
+            display_backend,
             the_world,
             agent_x,
             agent_y
         )
-
-    if use_display:
-        disp.update(
-            agent_x, agent_y, agent_facing
-        )
-        time.sleep(display_speed)
-
-    
+        # Frames are drawn by the renderer, which skips turns when the
+        # simulation outruns max_fps or render_every.
+        frames = renderer.Renderer(disp, display_speed, max_fps, render_every)
+        frames.draw(agent_x, agent_y, agent_facing)
+
+    if trace is not None:
+        write_to_trace(trace, {
+            "world": the_world.world_filename,
+            "width": the_world.get_width(),
+            "height": the_world.get_height(),
+            "start": [agent_x, agent_y],
+            "facing": agent_facing
+        })
 
     run = True
     while run:
 
         if ai_state != 'GOOD':
             run = False
-            write_to_log(
-                log,
-                f"-----Scenario Finished-----"
-            )
-            write_to_log(
-                log,
-                f"FINAL AGENT STATE: {ai_state}"
-            )
+            if not quiet:
+                write_to_log(
+                    log,
+                    f"-----Scenario Finished-----"
+                )
+                write_to_log(
+                    log,
+                    f"FINAL AGENT STATE: {ai_state}"
+                )
             continue
-        else:
+
+        if profiler is not None:
+            profiler.start_turn()
+
+        if not quiet:
             write_to_log(
                 log,
                 f"-----Turn {turn}-----"
             )
+        if profiler is not None:
+            profiler.mark("log")
 
         # What does the agent see?
         percepts = get_percepts(the_world, agent_x, agent_y, agent_facing)
+        if profiler is not None:
+            profiler.mark("get_percepts")
 
         # Get agent's command
+        update_start = time.perf_counter()
         agent_cmd = the_ai.update(percepts)
+        ai_latency = time.perf_counter() - update_start
+        ai_latencies.append(ai_latency)
+        turns_taken = turn
+
+        missed_deadline = ai_deadline is not None and ai_latency > ai_deadline
+        if missed_deadline:
+            deadline_misses += 1
+        if profiler is not None:
+            profiler.mark("ai_update")
 
         # LOG ###############################################################
-        write_to_log(
-            log,
-            f"Turn: {turn}"
-        )
-        write_to_log(
-            log,
-            f"   Start:    {agent_x},{agent_y}"
-        )
-        percept_str = ""
-        for k, v in percepts.items():
-            percept_str += f"({k} {v}) "
-        write_to_log(
-            log,
-            f"   Percepts: {percept_str}"
-        )
-        write_to_log(
-            log,
-            f"   Command:  {agent_cmd}"
-        )
+        if not quiet:
+            write_to_log(
+                log,
+                f"Turn: {turn}"
+            )
+            write_to_log(
+                log,
+                f"   Start:    {agent_x},{agent_y}"
+            )
+            percept_str = ""
+            for k, v in percepts.items():
+                percept_str += f"({k} {v}) "
+            write_to_log(
+                log,
+                f"   Percepts: {percept_str}"
+            )
+            write_to_log(
+                log,
+                f"   Command:  {agent_cmd}"
+            )
+            if missed_deadline:
+                write_to_log(
+                    log,
+                    f"   Deadline: AI took {ai_latency * 1000:.3f} ms (limit {ai_deadline * 1000:.3f} ms)"
+                )
         # ####################################################################
+        if profiler is not None:
+            profiler.mark("log")
+
+        start_x, start_y = agent_x, agent_y
+        trigger = None
 
         # Move the agent
-        if validate_agent_cmd(agent_cmd):
+        if missed_deadline and stop_on_deadline:
+            ai_state = 'TIMEOUT'
+
+        elif validate_agent_cmd(agent_cmd):
 
             new_agent_x = agent_x
             new_agent_y = agent_y
@@ -125,24 +225,27 @@ def run_sim(
             trigger = the_world.check_triggers(agent_x, agent_y, agent_cmd)
             match trigger[0]:
                 case "EXIT":
-                    write_to_log(
-                        log,
-                        f"   Trigger:  Agent has exited the environment."
-                    )
+                    if not quiet:
+                        write_to_log(
+                            log,
+                            f"   Trigger:  Agent has exited the environment."
+                        )
                     ai_state = 'EXITED'
                 case "TELEPORT":
-                    write_to_log(
-                        log,
-                        f"   Trigger:  Teleported from {the_world.get_cell(agent_x, agent_y)} to {the_world.get_cell(trigger[1], trigger[2])}"
-                    )
+                    if not quiet:
+                        write_to_log(
+                            log,
+                            f"   Trigger:  Teleported from {the_world.get_cell(agent_x, agent_y)} to {the_world.get_cell(trigger[1], trigger[2])}"
+                        )
                     agent_x = trigger[1]
                     agent_y = trigger[2]
                     
                 case "DOORS_OPEN":
-                    write_to_log(
-                        log,
-                        f"   Trigger:  Doors opened."
-                    )
+                    if not quiet:
+                        write_to_log(
+                            log,
+                            f"   Trigger:  Doors opened."
+                        )
                 case "GOAL_TRIGGERED":
                     # if trigger[1] == 0:
                     #     write_to_log(
@@ -156,59 +259,143 @@ def run_sim(
                     #     run = False
                     # else:
                     points += POINTS_PER_GOAL
-                    write_to_log(
-                        log,
-                        f"   Trigger:  Agent activated goal {trigger[2]}"
-                    )
+                    if not quiet:
+                        write_to_log(
+                            log,
+                            f"   Trigger:  Agent activated goal {trigger[2]}"
+                        )
                 case "NONE":
                     pass
 
 
-            write_to_log(
-                log,
-                f"   End:      {agent_x},{agent_y}"
-            )
+            if not quiet:
+                write_to_log(
+                    log,
+                    f"   End:      {agent_x},{agent_y}"
+                )
 
         else:
-            write_to_log(log, f"Invalid command: {agent_cmd}")
+            if not quiet:
+                write_to_log(log, f"Invalid command: {agent_cmd}")
             ai_state = 'BAD'
             run = False
 
-        if use_display:
-            disp.update(
-                agent_x, agent_y, agent_facing
-            )
-            time.sleep(display_speed)
+        # Stop runs that keep repeating the same moves in an unchanged world
+        if (cycle_detector is not None
+                and ai_state == 'GOOD'
+                and cycle_detector.update((start_x, start_y, agent_cmd, the_world.version))):
+            if not quiet:
+                write_to_log(
+                    log,
+                    f"   Cycle:    Agent is repeating a {cycle_detector.period}-turn cycle."
+                )
+            ai_state = 'LOOPING'
+        if profiler is not None:
+            profiler.mark("move")
+
+        if trace is not None:
+            write_to_trace(trace, {
+                "turn": turn,
+                "start": [start_x, start_y],
+                "percepts": percepts,
+                "command": agent_cmd,
+                "trigger": trigger,
+                "end": [agent_x, agent_y],
+                "score": points
+            })
+        if profiler is not None:
+            profiler.mark("log")
 
+        if use_display:
+            frames.update(turn, agent_x, agent_y, agent_facing)
+        if profiler is not None:
+            profiler.mark("display")
 
-        if max_turns is not None:
-            if turn >= max_turns:
+        if max_turns is not None and turn >= max_turns:
+            if not quiet:
                 write_to_log(
                     log,
                     f"---MAX TURNS REACHED---"
                 )
-                run = False
-                continue
+            run = False
+            if profiler is not None:
+                profiler.mark("log")
+        else:
+            points -= 1
+            turn += 1
+
+            if (checkpoint_every is not None
+                    and ai_state == 'GOOD'
+                    and (turn - 1) % checkpoint_every == 0):
+                checkpoint.save_checkpoint(checkpoint_filename, {
+                    "world": the_world.world_filename,
+                    "world_map": the_world.world_map,
+                    "world_version": the_world.version,
+                    "doors_closed": the_world.doors_closed,
+                    "ai_mode": ai_mode,
+                    "ai": the_ai,
+                    "agent_x": agent_x,
+                    "agent_y": agent_y,
+                    "agent_facing": agent_facing,
+                    "turn": turn,
+                    "points": points,
+                    "ai_state": ai_state,
+                    "ai_latencies": ai_latencies,
+                    "deadline_misses": deadline_misses,
+                    "cycles": cycle_detector
+                })
+                if profiler is not None:
+                    profiler.mark("checkpoint")
+
+        if profiler is not None:
+            profiler.end_turn()
+
+    if not quiet:
+        write_to_log(
+            log,
+            f"FINAL SCORE: {points}"
+        )
 
-        points -= 1
-        turn += 1
+    latency = latency_summary(ai_latencies)
+    if not quiet:
+        write_to_log(
+            log,
+            f"AI LATENCY (ms): "
+            f"p50 {latency['p50'] * 1000:.3f} "
+            f"p95 {latency['p95'] * 1000:.3f} "
+            f"p99 {latency['p99'] * 1000:.3f} "
+            f"max {latency['max'] * 1000:.3f}"
+        )
+        if ai_deadline is not None:
+            write_to_log(
+                log,
+                f"AI DEADLINE MISSES: {deadline_misses}"
+            )
 
-    write_to_log(
-        log,
-        f"FINAL SCORE: {points}"
-    )
+    if trace is not None:
+        write_to_trace(trace, {
+            "turns": turns_taken,
+            "score": points,
+            "ai_state": ai_state
+        })
 
     if use_display:
+        frames.finish()
         disp.quit()
 
+    return {
+        "turns": turns_taken,
+        "score": points,
+        "ai_state": ai_state,
+        "latency": latency,
+        "deadline_misses": deadline_misses
+    }
+
 def get_percepts(the_world, agent_x, agent_y, agent_facing):
     # percepts = the_world.get_cells_around(agent_x, agent_y)
     percepts = {'X':[the_world.get_cell(agent_x, agent_y)]}
-    for d, v in DIRECTIONS.items():
-        dx, dy = v
-        ray = the_world.raycast(agent_x, agent_y, dx, dy)
-        ray = the_world.prune_raycast(ray)
-        percepts[d] = ray
+    for d in DIRECTIONS:
+        percepts[d] = the_world.get_ray(agent_x, agent_y, d)
 
     # percepts = [the_world.get_cell(agent_x, agent_y)]
     # dx, dy = DIRECTIONS[agent_facing]
@@ -222,16 +409,34 @@ def get_percepts(the_world, agent_x, agent_y, agent_facing):
     return percepts
 
 
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0
+    }
+
 def validate_agent_cmd(cmd):
     return cmd in VALID_COMMANDS
 
 def write_to_log(log, msg):
     if log is not None:
         log.write(f"{msg}\n")
-        log.flush()
     else:
         print(msg)
 
+def write_to_trace(trace, record):
+    trace.write(json.dumps(record, separators=(",", ":")) + "\n")
+
 def turn_right(cur_facing):
     match cur_facing:
         case 'N': return 'E'
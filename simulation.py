@@ -0,0 +1,298 @@
+import numpy as np
+import world
+import sim
+
+# Actions may be given as command letters or as indices into this list.
+ACTIONS = ['N', 'E', 'S', 'W', 'U']
+# Code used for the unused tail of every ray in an observation.
+PAD = len(world.World.VALID_CELLS)
+ACTION_CODES = {cmd: k for k, cmd in enumerate(ACTIONS)}
+# (dx, dy) of each move, in ACTIONS order.
+MOVES = np.array([sim.DIRECTIONS[cmd] for cmd in ACTIONS[:4]])
+
+class Simulation:
+    """
+    Step-by-step version of run_sim for driving the world from outside code.
+    There is no logging or display; step(cmd) applies one command and
+    returns (observation, reward, done, info).
+
+    An observation is a dict with "X", the code of the agent's cell, and
+    "rays", a (4, ray_width) uint8 array holding the cells seen to the
+    N, E, S and W (nearest first), padded with PAD. Cell codes are indices
+    into World.VALID_CELLS. The reward is the change in score, so the
+    rewards of a run add up to run_sim's final score minus 1000.
+    """
+
+    def __init__(self, world_filename, max_turns=None, use_cache=True):
+        self.world_filename = world_filename
+        self.max_turns = max_turns
+        self.use_cache = use_cache
+        self.the_world = world.World(world_filename, use_cache)
+        self.the_world.load_world()
+        # every reset rolls the world back to this point
+        self.start = self.the_world.snapshot()
+        # long enough for a ray across the whole world
+        self.ray_width = max(self.the_world.get_width(), self.the_world.get_height()) - 1
+        self.reset_state()
+
+    def reset_state(self):
+        self.agent_x, self.agent_y = self.the_world.get_startxy()
+        self.agent_facing = self.the_world.get_start_face_dir()
+        self.turn = 1
+        self.points = 1000
+        self.ai_state = 'GOOD'
+        self.done = False
+
+    def reset(self):
+        self.the_world.restore(self.start)
+        self.reset_state()
+        return self.observe()
+
+    def percepts(self):
+        # The same percepts dictionary run_sim hands to an AI.
+        return sim.get_percepts(
+            self.the_world, self.agent_x, self.agent_y, self.agent_facing
+        )
+
+    def observe(self, rays=None):
+        if rays is None:
+            rays = np.empty((4, self.ray_width), dtype=np.uint8)
+        # Unrolled on purpose: this runs on every step.
+        rays.fill(PAD)
+        grid = self.the_world.world_map
+        lengths = self.the_world.ray_lengths
+        x, y = self.agent_x, self.agent_y
+        n = lengths['N'][y, x]
+        rays[0, :n] = grid[y-n:y, x][::-1]
+        n = lengths['E'][y, x]
+        rays[1, :n] = grid[y, x+1:x+1+n]
+        n = lengths['S'][y, x]
+        rays[2, :n] = grid[y+1:y+1+n, x]
+        n = lengths['W'][y, x]
+        rays[3, :n] = grid[y, x-n:x][::-1]
+        return {"X": int(grid[y, x]), "rays": rays}
+
+    def advance(self, cmd):
+        # Applies one command; returns (reward, done, info) without observing.
+        if self.done:
+            raise RuntimeError("step() called on a finished simulation; call reset().")
+        if not isinstance(cmd, str):
+            # an index outside ACTIONS is an invalid command, like a bad letter
+            cmd = ACTIONS[cmd] if 0 <= cmd < len(ACTIONS) else None
+
+        start_points = self.points
+        trigger = None
+        if sim.validate_agent_cmd(cmd):
+            if cmd in sim.DIRECTIONS:
+                dx, dy = sim.DIRECTIONS[cmd]
+                if self.the_world.is_cell_enterable(self.agent_x + dx, self.agent_y + dy):
+                    self.agent_x += dx
+                    self.agent_y += dy
+
+            trigger = self.the_world.check_triggers(self.agent_x, self.agent_y, cmd)
+            match trigger[0]:
+                case "EXIT":
+                    self.ai_state = 'EXITED'
+                case "TELEPORT":
+                    self.agent_x = trigger[1]
+                    self.agent_y = trigger[2]
+                case "GOAL_TRIGGERED":
+                    self.points += sim.POINTS_PER_GOAL
+        else:
+            self.ai_state = 'BAD'
+
+        turns_taken = self.turn
+        if self.max_turns is not None and self.turn >= self.max_turns:
+            self.done = True
+        else:
+            self.points -= 1
+            self.turn += 1
+        if self.ai_state != 'GOOD':
+            self.done = True
+
+        info = {
+            "turn": turns_taken,
+            "score": self.points,
+            "ai_state": self.ai_state,
+            "trigger": trigger,
+            "position": (self.agent_x, self.agent_y)
+        }
+        return self.points - start_points, self.done, info
+
+    def step(self, cmd):
+        reward, done, info = self.advance(cmd)
+        return self.observe(), reward, done, info
+
+class VecSimulation:
+    """
+    Steps a batch of Simulations together. Observations are stacked: "X"
+    has shape (n,) and "rays" (n, 4, ray_width), with ray_width the widest
+    of the batch. A simulation that finishes is reset straight away; its
+    last observation is kept in info["terminal_observation"].
+
+    Walls never change during a run, so the simulations of one world file
+    share a table of open cells and the ray lengths, and moves, scoring and
+    observations are worked out for the whole batch with array operations.
+    Only 'U' and invalid commands, which can fire triggers, go through
+    Simulation.advance one simulation at a time. Each step has a fixed cost
+    of a few dozen array operations, so a single run is faster with
+    Simulation.step.
+    """
+
+    def __init__(self, simulations):
+        self.simulations = simulations
+        n = len(simulations)
+        self.ray_width = max(s.ray_width for s in simulations)
+        self.cells = np.zeros(n, dtype=np.uint8)
+        self.rays = np.full((n, 4, self.ray_width), PAD, dtype=np.uint8)
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.turn = np.zeros(n, dtype=np.int64)
+        self.points = np.zeros(n, dtype=np.int64)
+        no_limit = np.iinfo(np.int64).max
+        self.max_turns = np.array(
+            [no_limit if s.max_turns is None else s.max_turns for s in simulations],
+            dtype=np.int64
+        )
+
+        indices_of = {}
+        for k, s in enumerate(simulations):
+            indices_of.setdefault(s.world_filename, []).append(k)
+        # Each group keeps a copy of its members' grids, refreshed from the
+        # world whenever its version shows a trigger changed it. Cells are
+        # addressed by flat index; the open-cell table has a border of walls
+        # so that a move off the edge needs no bounds check.
+        self.groups = []
+        self.slot = [None] * n
+        self.versions = [None] * n
+        for indices in indices_of.values():
+            the_world = simulations[indices[0]].the_world
+            height, width = the_world.world_map.shape
+            grids = np.stack([simulations[k].the_world.world_map for k in indices])
+            if indices[-1] - indices[0] == len(indices) - 1:
+                members = slice(indices[0], indices[-1] + 1)
+            else:
+                members = np.array(indices)
+            group = {
+                "members": members,
+                "width": width,
+                "open": np.pad(
+                    ~np.isin(the_world.world_map, world.World.WALL_CODES), 1
+                ).ravel(),
+                "lengths": np.stack(
+                    [the_world.ray_lengths[d].ravel() for d in ACTIONS[:4]]
+                ),
+                "steps": (MOVES[:, 1] * width + MOVES[:, 0])[:, None],
+                "offsets": np.arange(1, simulations[indices[0]].ray_width + 1),
+                "grids": grids,
+                "cells": grids.reshape(-1),
+                "bases": np.arange(len(indices)) * height * width
+            }
+            for i, k in enumerate(indices):
+                self.slot[k] = (group, i)
+            self.groups.append(group)
+        for k in range(n):
+            self.load(k)
+
+    def __len__(self):
+        return len(self.simulations)
+
+    def load(self, k):
+        # Copies simulation k's state into the batch arrays.
+        s = self.simulations[k]
+        self.x[k] = s.agent_x
+        self.y[k] = s.agent_y
+        self.turn[k] = s.turn
+        self.points[k] = s.points
+        if self.versions[k] != s.the_world.version:
+            group, i = self.slot[k]
+            group["grids"][i] = s.the_world.world_map
+            self.versions[k] = s.the_world.version
+
+    def observations(self):
+        return {"X": self.cells.copy(), "rays": self.rays.copy()}
+
+    def observe_all(self):
+        # Same layout as Simulation.observe, gathered for a whole group at
+        # once. Offsets past a ray's length are pulled back onto the ray so
+        # that every index stays inside the grid, then replaced by PAD.
+        for group in self.groups:
+            members = group["members"]
+            cell = self.y[members] * group["width"] + self.x[members]
+            base = cell + group["bases"]
+            self.cells[members] = group["cells"][base]
+            lengths = group["lengths"][:, cell].T[:, :, None]
+            offsets = group["offsets"]
+            along = np.minimum(offsets, lengths) * group["steps"]
+            self.rays[members, :, :len(offsets)] = np.where(
+                offsets <= lengths, group["cells"][base[:, None, None] + along], PAD
+            )
+
+    def reset(self):
+        for k, s in enumerate(self.simulations):
+            s.reset()
+            self.load(k)
+        self.observe_all()
+        return self.observations()
+
+    def step(self, cmds):
+        codes = action_codes(cmds)
+        move = (codes >= 0) & (codes < len(MOVES))
+
+        # Moves for the whole batch: a move never fires a trigger, so all it
+        # can do is change the position, the turn and the score.
+        direction = np.where(move, codes, 0)
+        dx = MOVES[direction, 0]
+        dy = MOVES[direction, 1]
+        for group in self.groups:
+            members = group["members"]
+            to = ((self.y[members] + dy[members] + 1) * (group["width"] + 2)
+                  + self.x[members] + dx[members] + 1)
+            moved = move[members] & group["open"][to]
+            self.x[members] += moved * dx[members]
+            self.y[members] += moved * dy[members]
+        turns_taken = self.turn.copy()
+        last = self.turn >= self.max_turns
+        counted = move & ~last
+        self.points -= counted
+        self.turn += counted
+        rewards = -counted.astype(np.int64)
+        dones = (move & last).tolist()
+
+        infos = []
+        moves = move.tolist()
+        xs, ys = self.x.tolist(), self.y.tolist()
+        turns, points = self.turn.tolist(), self.points.tolist()
+        turns_taken = turns_taken.tolist()
+        for k, s in enumerate(self.simulations):
+            if moves[k]:
+                s.agent_x, s.agent_y = xs[k], ys[k]
+                s.turn, s.points = turns[k], points[k]
+                info = {
+                    "turn": turns_taken[k],
+                    "score": points[k],
+                    "ai_state": s.ai_state,
+                    "trigger": ["NONE"],
+                    "position": (xs[k], ys[k])
+                }
+            else:
+                rewards[k], dones[k], info = s.advance(cmds[k])
+            if dones[k]:
+                s.done = True
+                info["terminal_observation"] = s.observe()
+                s.reset()
+            if dones[k] or not moves[k]:
+                self.load(k)
+            infos.append(info)
+
+        self.observe_all()
+        return self.observations(), rewards, np.array(dones), infos
+
+def action_codes(cmds):
+    # Index into ACTIONS of every command, or -1 for an unknown letter.
+    if isinstance(cmds, np.ndarray) and cmds.dtype.kind in "iu":
+        return cmds.astype(np.int64)
+    return np.array(
+        [ACTION_CODES.get(cmd, -1) if isinstance(cmd, str) else cmd for cmd in cmds],
+        dtype=np.int64
+    )
@@ -1,3 +1,7 @@
+import os
+import json
+import struct
+import numpy as np
 import misc
 
 class World:
@@ -18,19 +22,58 @@ class World:
 
     DIRECTIONS = ['N', 'E', 'S', 'W']
 
-    def __init__(self, world_filename):
+    # Stair cells and the stair type they teleport to.
+    STAIR_PAIRS = {'b': 'o', 'o': 'b', 'y': 'p', 'p': 'y'}
+
+    # Each cell type is stored in the grid as its index in VALID_CELLS.
+    CELL_CODES = {cell: code for code, cell in enumerate(VALID_CELLS)}
+    WALL_CODES = list(map(CELL_CODES.get, WALL_CELLS))
+    GOAL_CODES = list(map(CELL_CODES.get, GOAL_CELLS))
+    CELL_CHARS = np.array(VALID_CELLS)
+
+    # Compiled worlds are cached next to their source file. The cache holds
+    # a fixed header (magic, source mtime_ns, source size, metadata length),
+    # the JSON metadata and then the grid codes, one byte per cell.
+    COMPILED_SUFFIX = ".wc"
+    COMPILED_MAGIC = b"WCv1"
+    COMPILED_HEADER = struct.Struct("<4sqqI")
+
+    def __init__(self, world_filename, use_cache=True):
         self.world_filename = world_filename
+        self.use_cache = use_cache
         self.start_x = None
         self.start_y = None
         self.face_dir = None
         self.width = 0
         self.height = 0
-        self.world_map = []
+        self.world_map = np.zeros((0, 0), dtype=np.uint8)
+        # Row-major and column-major copies of the map as cell strings, so a
+        # percept ray is a single list slice.
+        self.rows = []
+        self.cols = []
+        # Number of cells seen from each cell in each direction, up to and
+        # including the first wall.
+        self.ray_lengths = {}
         self.doors_closed = True
-        self.goals = []
+        self.cell_positions = {}
+        self.teleports = {}
+        # (x, y, old cell) for every set_cell since the first snapshot, so
+        # restore only has to undo what actually changed.
+        self.journal = None
+        # Journal position of every snapshot that can still be restored,
+        # keyed by the generation number handed out with it.
+        self.generation = 0
+        self.live_snapshots = {}
+        # Bumped on every set_cell, so a changed world is never mistaken
+        # for an earlier state of itself.
+        self.version = 0
 
     def load_world(self):
         try:
+            source = os.stat(self.world_filename)
+            if self.use_cache and self.load_compiled(source):
+                return
+
             with open(self.world_filename, 'r') as f:
 
                 # Parse agent starting location
@@ -58,39 +101,203 @@ class World:
                     )
 
                 # Parse the world
+                rows = []
                 for line in f:
                     line = line.split()
+                    if not line:
+                        continue
                     row = []
                     for element in line:
-                        if element not in World.VALID_CELLS:
+                        code = World.CELL_CODES.get(element)
+                        if code is None:
                             raise misc.InvalidCellException(
                                 f"{element} is not a valid cell type."
                             )
-                        row.append(element)
-                    self.world_map.append(row)
+                        row.append(code)
+                    if rows and len(row) != len(rows[0]):
+                        raise misc.InvalidWorldException(
+                            f"World {self.world_filename} has rows of different widths."
+                        )
+                    rows.append(row)
+
+                if not rows:
+                    raise misc.InvalidWorldException(
+                        f"World {self.world_filename} has no cells."
+                    )
 
-                self.height = len(self.world_map)
-                self.width = len(self.world_map[0])
+                self.world_map = np.array(rows, dtype=np.uint8)
+                self.height, self.width = self.world_map.shape
 
-                # Find all the goals
-                self.find_goals()
+            # Index where each cell type is
+            self.index_cells()
+            self.index_rays()
+
+            # Pair up the stairs
+            self.index_teleports('b')
+            self.index_teleports('y')
+
+            if self.use_cache:
+                self.save_compiled(source)
 
         except FileNotFoundError:
             print(f"{self.world_filename} was not found.")
 
+    def compiled_filename(self):
+        return self.world_filename + World.COMPILED_SUFFIX
+
+    def load_compiled(self, source):
+        # Returns False, leaving the world untouched, if there is no usable
+        # cache for the source file as it is now.
+        try:
+            with open(self.compiled_filename(), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return False
+
+        header_size = World.COMPILED_HEADER.size
+        if len(data) < header_size:
+            return False
+        magic, mtime_ns, size, meta_length = World.COMPILED_HEADER.unpack_from(data)
+        if (magic != World.COMPILED_MAGIC
+                or mtime_ns != source.st_mtime_ns
+                or size != source.st_size):
+            return False
+
+        # Everything is unpacked into locals first, so that metadata with
+        # missing or mistyped entries is rejected before the world changes.
+        try:
+            meta = json.loads(data[header_size:header_size + meta_length])
+            start_x, start_y = map(int, meta["start"])
+            face_dir = meta["facing"]
+            width = int(meta["width"])
+            height = int(meta["height"])
+            teleports = {
+                (x, y): (to_x, to_y) for x, y, to_x, to_y in meta["teleports"]
+            }
+            grid = np.frombuffer(data, dtype=np.uint8, offset=header_size + meta_length)
+            if grid.size != width * height or grid.size == 0:
+                return False
+            world_map = grid.reshape(height, width).copy()
+        except (ValueError, KeyError, TypeError):
+            return False
+        if face_dir not in World.DIRECTIONS:
+            return False
+        if world_map.max() >= len(World.VALID_CELLS):
+            return False
+
+        self.start_x, self.start_y = start_x, start_y
+        self.face_dir = face_dir
+        self.width = width
+        self.height = height
+        self.world_map = world_map
+        self.index_cells()
+        self.index_rays()
+        self.teleports = teleports
+        return True
+
+    def save_compiled(self, source):
+        meta = json.dumps({
+            "start": [self.start_x, self.start_y],
+            "facing": self.face_dir,
+            "width": self.width,
+            "height": self.height,
+            "teleports": [
+                [x, y, to_x, to_y] for (x, y), (to_x, to_y) in self.teleports.items()
+            ]
+        }).encode()
+        header = World.COMPILED_HEADER.pack(
+            World.COMPILED_MAGIC, source.st_mtime_ns, source.st_size, len(meta)
+        )
+
+        # Write to a temporary file first so that concurrent batch workers
+        # never read a half-written cache. The cache is only an optimization:
+        # a read-only world directory just means the text is parsed each time.
+        compiled = self.compiled_filename()
+        tmp = f"{compiled}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(header + meta + self.world_map.tobytes())
+            os.replace(tmp, compiled)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
     def prettyprint_world(self):
         for row in self.world_map:
-            for ele in row:
-                print(f"{ele} ",end="")
+            for code in row:
+                print(f"{World.VALID_CELLS[code]} ",end="")
             print()
 
 
+    def index_cells(self):
+        # The position sets are built on first use. Open and wall cells make
+        # up nearly the whole grid and are rarely looked up, so indexing them
+        # up front would dominate load time.
+        self.cell_positions = {}
+
+    def positions_of(self, flag):
+        positions = self.cell_positions.get(flag)
+        if positions is None:
+            code = World.CELL_CODES.get(flag)
+            if code is None:
+                return set()
+            ys, xs = np.nonzero(self.world_map == code)
+            positions = set(zip(xs.tolist(), ys.tolist()))
+            self.cell_positions[flag] = positions
+        return positions
+
+    def index_rays(self):
+        cells = World.CELL_CHARS[self.world_map]
+        self.rows = cells.tolist()
+        self.cols = cells.T.tolist()
+        walls = np.isin(self.world_map, World.WALL_CODES)
+        self.ray_lengths['W'], self.ray_lengths['E'] = World.measure_rays(walls)
+        north, south = World.measure_rays(walls.T)
+        self.ray_lengths['N'], self.ray_lengths['S'] = north.T, south.T
+
+    @staticmethod
+    def measure_rays(walls):
+        # For each cell, count the cells towards the start and the end of its
+        # row up to and including the nearest wall, or to the map edge.
+        length = walls.shape[1]
+        index = np.arange(length)
+        prev_wall = np.maximum.accumulate(np.where(walls, index, -1), axis=1)
+        prev_wall = np.pad(prev_wall[:, :-1], ((0, 0), (1, 0)), constant_values=-1)
+        next_wall = np.minimum.accumulate(
+            np.where(walls, index, length)[:, ::-1], axis=1
+        )[:, ::-1]
+        next_wall = np.pad(next_wall[:, 1:], ((0, 0), (0, 1)), constant_values=length)
+        backward = index - np.maximum(prev_wall, 0)
+        forward = np.minimum(next_wall, length - 1) - index
+        return backward, forward
+
     def find_goals(self):
-        for row in self.world_map:
-            for ele in row:
-                if ele in World.GOAL_CELLS:
-                    self.goals.append(ele)
-        self.goals.sort()
+        goals = []
+        for cell in sorted(World.GOAL_CELLS):
+            goals += [cell] * len(self.positions_of(cell))
+        return goals
+
+    def count_goals(self):
+        return sum(len(self.positions_of(cell)) for cell in World.GOAL_CELLS)
+
+    def index_teleports(self, flag):
+        # The k-th stair of one type (in row-major order) leads to the k-th
+        # stair of its partner type. Unpaired extras lead to the first one.
+        partner = World.STAIR_PAIRS[flag]
+        positions = {
+            stair: self.find_all_cells(stair) for stair in (flag, partner)
+        }
+        for stair, other in ((flag, partner), (partner, flag)):
+            targets = positions[other]
+            for k, xy in enumerate(positions[stair]):
+                if not targets:
+                    self.teleports.pop(xy, None)
+                elif k < len(targets):
+                    self.teleports[xy] = targets[k]
+                else:
+                    self.teleports[xy] = targets[0]
 
     def get_width(self):
         return self.width
@@ -105,22 +312,86 @@ class World:
         return self.face_dir
 
     def get_cell(self, x, y):
-        return self.world_map[y][x]
+        return self.rows[y][x]
     
     def set_cell(self, x, y, flag):
-        self.world_map[y][x] = flag
+        code = World.CELL_CODES.get(flag)
+        if code is None:
+            raise misc.InvalidCellException(f"{flag} is not a valid cell type.")
+        old_flag = self.get_cell(x, y)
+        if self.journal is not None:
+            self.journal.append((x, y, old_flag))
+        self.version += 1
+        self.world_map[y, x] = code
+        self.rows[y][x] = flag
+        self.cols[x][y] = flag
+        if old_flag in self.cell_positions:
+            self.cell_positions[old_flag].discard((x, y))
+        if flag in self.cell_positions:
+            self.cell_positions[flag].add((x, y))
+        if (old_flag in World.WALL_CELLS) != (flag in World.WALL_CELLS):
+            self.update_rays(x, y)
+        if old_flag in World.STAIR_PAIRS:
+            self.teleports.pop((x, y), None)
+            self.index_teleports(old_flag)
+        if flag in World.STAIR_PAIRS:
+            self.index_teleports(flag)
 
-    def is_valid_cell(self, x, y):
+    def snapshot(self):
+        # A snapshot is a generation number, the journal position and the
+        # door state. Restoring one makes every snapshot taken after it
+        # (further along the journal) invalid; the restored one stays valid.
+        if self.journal is None:
+            self.journal = []
+        self.generation += 1
+        self.live_snapshots[self.generation] = len(self.journal)
+        return (self.generation, len(self.journal), self.doors_closed)
+
+    def restore(self, snapshot):
+        generation, position, doors_closed = snapshot
+        if self.live_snapshots.get(generation) != position:
+            raise ValueError("Snapshot is not valid for this world any more.")
+        self.live_snapshots = {
+            g: p for g, p in self.live_snapshots.items() if p <= position
+        }
+        journal = self.journal
+        self.journal = None
         try:
-            self.world_map[y][x]
-            return True
-        except IndexError:
-            return False
+            for x, y, flag in reversed(journal[position:]):
+                self.set_cell(x, y, flag)
+        finally:
+            del journal[position:]
+            self.journal = journal
+        self.doors_closed = doors_closed
+
+    def apply_map(self, world_map):
+        # Changes every cell that differs from world_map, a grid of codes of
+        # the same shape (e.g. one saved in a checkpoint).
+        if world_map.shape != self.world_map.shape:
+            raise misc.InvalidWorldException(
+                f"World {self.world_filename} does not match the saved grid."
+            )
+        ys, xs = np.nonzero(self.world_map != world_map)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.set_cell(x, y, World.VALID_CELLS[world_map[y, x]])
+
+    def update_rays(self, x, y):
+        # Only the row and column through (x, y) can see a changed wall.
+        row_walls = np.isin(self.world_map[y:y+1, :], World.WALL_CODES)
+        west, east = World.measure_rays(row_walls)
+        self.ray_lengths['W'][y, :] = west[0]
+        self.ray_lengths['E'][y, :] = east[0]
+        col_walls = np.isin(self.world_map[:, x:x+1].T, World.WALL_CODES)
+        north, south = World.measure_rays(col_walls)
+        self.ray_lengths['N'][:, x] = north[0]
+        self.ray_lengths['S'][:, x] = south[0]
+
+    def is_valid_cell(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
 
     def is_cell_enterable(self, x, y):
         if self.is_valid_cell(x, y):
-            cell = self.get_cell(x, y)
-            return cell not in World.WALL_CELLS
+            return self.world_map[y, x] not in World.WALL_CODES
         else:
             return False
 
@@ -153,20 +424,36 @@ class World:
                 break
         return cells[:i+1]
 
+    def get_ray(self, x, y, direction):
+        # Same cells as prune_raycast(raycast(...)), read from the tables.
+        return self.ray_cells(x, y, direction, int(self.ray_lengths[direction][y, x]))
+
+    def ray_cells(self, x, y, direction, n):
+        # The n cells next to (x, y) in direction, nearest first.
+        match direction:
+            case 'N': return self.cols[x][y-n:y][::-1]
+            case 'E': return self.rows[y][x+1:x+1+n]
+            case 'S': return self.cols[x][y+1:y+1+n]
+            case 'W': return self.rows[y][x-n:x][::-1]
+
     def find_cell(self, flag):
-        for y in range(len(self.world_map)):
-            for x in range(len(self.world_map[y])):
-                cell = self.get_cell(x, y)
-                if cell == flag:
-                    return (x, y)
-        return None
+        # First match in row-major (y, then x) order.
+        positions = self.positions_of(flag)
+        if not positions:
+            return None
+        return min(positions, key=lambda xy: (xy[1], xy[0]))
+
+    def find_all_cells(self, flag):
+        positions = self.positions_of(flag)
+        return sorted(positions, key=lambda xy: (xy[1], xy[0]))
 
     def swap_all_cells(self, flagA, flagB):
-        for y in range(len(self.world_map)):
-            for x in range(len(self.world_map[y])):
-                cell = self.get_cell(x, y)
-                if cell == flagA:
-                    self.set_cell(x, y, flagB)
+        if flagB not in World.CELL_CODES:
+            raise misc.InvalidCellException(f"{flagB} is not a valid cell type.")
+        if flagA == flagB:
+            return
+        for x, y in list(self.positions_of(flagA)):
+            self.set_cell(x, y, flagB)
 
     def check_triggers(self, x, y, cmd):
         if self.is_valid_cell(x, y):
@@ -174,26 +461,12 @@ class World:
             
             if cell == "r" and cmd == "U":
                 return ["EXIT"]
-            elif cell == "b" and cmd == "U":
-                nxny = self.find_cell("o")
-                if nxny is not None:
-                    return ["TELEPORT", nxny[0], nxny[1]]
-            elif cell == "o" and cmd == "U":
-                nxny = self.find_cell("b")
-                if nxny is not None:
-                    return ["TELEPORT", nxny[0], nxny[1]]
-            elif cell == "y" and cmd == "U":
-                nxny = self.find_cell("p")
-                if nxny is not None:
-                    return ["TELEPORT", nxny[0], nxny[1]]
-            elif cell == "p" and cmd == "U":
-                nxny = self.find_cell("y")
+            elif cell in World.STAIR_PAIRS and cmd == "U":
+                nxny = self.teleports.get((x, y))
                 if nxny is not None:
                     return ["TELEPORT", nxny[0], nxny[1]]
             elif cell in World.GOAL_CELLS and cmd == "U":
-                index = self.goals.index(cell)
                 self.swap_all_cells(cell, "g")
-                del self.goals[index]
-                return ["GOAL_TRIGGERED", len(self.goals), cell]
+                return ["GOAL_TRIGGERED", self.count_goals(), cell]
                 
         return ["NONE"]